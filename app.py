@@ -3,18 +3,37 @@ Flask API wrapper for find_sds functionality
 Provides REST API endpoints for searching Safety Data Sheets by CAS number or product name
 """
 
+import atexit
+import copy
+import hashlib
+import logging
+import mimetypes
 import os
+import queue
+import re
 import tempfile
-import uuid
+import threading
+import time
+from secrets import token_urlsafe
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 import shutil
-import traceback
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from itertools import chain
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
+import orjson
+import requests
+from cachetools import TTLCache
 from flask import Flask, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
+from flask.logging import default_handler
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from werkzeug.exceptions import BadRequest
 
-from find_sds.find_sds import find_sds as find_sds_by_cas, download_sds
+from find_sds.find_sds import find_sds as find_sds_by_cas, download_sds, is_valid_cas
 from find_sds.find_sds import (
     extract_download_url_from_chemblink,
     extract_download_url_from_vwr,
@@ -23,404 +42,900 @@ from find_sds.find_sds import (
     extract_download_url_from_chemicalsafety,
     extract_download_url_from_fluorochem
 )
+from find_sds.enhanced_search import (
+    extract_download_url_from_chemicalsafety_by_name,
+    extract_download_url_from_vwr_by_name,
+    extract_download_url_from_fisher_by_name,
+    extract_download_url_from_tci_by_name,
+    extract_download_url_from_chemblink_by_name,
+    extract_download_url_from_fluorochem_by_name
+)
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider using orjson, which is much faster than the standard json module"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        # Keys are sorted to match Flask's default output
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # jsonify() goes through here, the bytes from orjson are used as the
+        # body directly instead of being decoded and encoded again
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS)
+        return self._app.response_class(body, mimetype=self.mimetype)
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+
+# Log through a queue so log records are written by a listener thread instead
+# of the request threads. Logs go to stderr, or to a rotating file if
+# SDS_LOG_FILE is set
+if os.environ.get('SDS_LOG_FILE'):
+    _log_handler = RotatingFileHandler(os.environ['SDS_LOG_FILE'], maxBytes=10 * 1024 * 1024, backupCount=5)
+else:
+    _log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s'))
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+app.logger.removeHandler(default_handler)
+app.logger.addHandler(QueueHandler(_log_queue))
+app.logger.setLevel(logging.INFO)
+
+# Let the front-end server send downloaded files with sendfile(2) instead of
+# streaming them through Python: SDS_X_SENDFILE=1 for Apache/lighttpd X-Sendfile,
+# SDS_X_ACCEL_REDIRECT=<internal location> for nginx
+app.config['USE_X_SENDFILE'] = os.environ.get('SDS_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+X_ACCEL_REDIRECT_PREFIX = os.environ.get('SDS_X_ACCEL_REDIRECT', '').rstrip('/')
 
 # Global configuration
 TEMP_DIR = Path(tempfile.gettempdir()) / "sds_downloads"
 TEMP_DIR.mkdir(exist_ok=True)
+MAX_CONCURRENT_DOWNLOADS = 5  # Maximum number of SDS files downloaded at the same time
+DOWNLOAD_CHUNK_SIZE = 64 * 1024  # Bytes read from the network at a time when downloading
+DOWNLOAD_WRITE_BUFFER_SIZE = 1024 * 1024  # Bytes buffered before writing a download to disk
+MAX_DOWNLOAD_SIZE = 50 * 1024 * 1024  # Largest SDS file in bytes that will be downloaded
+SEARCH_CACHE_TTL = 3600  # Seconds search results are cached for
+SEARCH_ERROR_CACHE_TTL = 60  # Seconds search results are cached for when a database failed
+TEMP_DIR_TTL = 3600  # Seconds downloaded files are kept before being deleted
+TEMP_DIR_SWEEP_INTERVAL = 600  # Seconds between checks for expired downloads
+TEMP_DIR_MAX_SIZE = 2 * 1024 ** 3  # Bytes of downloads kept before the oldest are deleted
+JOB_STALE_AFTER = 24 * 3600  # Seconds after which a queued or running job is assumed to be lost
+# Downloaded files keyed by a hash of their URL, linked into the request
+# directories so a file downloaded by several requests is only fetched once
+DOWNLOAD_CACHE_DIR = TEMP_DIR / "_shared"
+DOWNLOAD_CACHE_DIR.mkdir(exist_ok=True)
+JOB_STATUS_FILE = "job.json"  # Status of background jobs, stored in the request directory
+# Request ids are made with token_urlsafe(12), anything else can't be a request
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{16}')
+SEARCH_WORKERS = int(os.environ.get('SDS_SEARCH_WORKERS', 16))  # Identifiers searched at the same time
+# Database queries running at the same time, by default enough for every
+# search worker to query all six databases at once
+SOURCE_WORKERS = int(os.environ.get('SDS_SOURCE_WORKERS', SEARCH_WORKERS * 6))
 
-@app.route('/', methods=['GET'])
-def home():
-    """API documentation endpoint"""
-    return jsonify({
-        "message": "SDS Finder API",
-        "version": "3.0.0",
-        "description": "Search for Safety Data Sheets by CAS number or product name across multiple databases",
-        "features": [
-            "Searches across 6 major chemical databases: ChemBlink, VWR/Avantor, Fisher Scientific, TCI, ChemicalSafety, Fluorochem",
-            "Returns ALL available results from each database, not just the first match",
-            "Supports both CAS number and product name searches",
-            "Provides detailed status information for each database searched"
-        ],
-        "endpoints": {
-            "/search/cas": {
-                "method": "POST",
-                "description": "Search for SDS by CAS number(s) across all databases",
-                "parameters": {
-                    "cas_numbers": "List of CAS numbers (required)",
-                    "download": "Boolean to download files (optional, default: false)"
-                },
-                "response": {
-                    "results": [
-                        {
-                            "cas_number": "string",
-                            "found": "boolean",
-                            "sources": "array of successful sources with URLs",
-                            "all_sources": "array showing status of all databases searched",
-                            "primary_source": "string (first successful source)",
-                            "primary_url": "string (URL from primary source)"
-                        }
-                    ]
-                }
-            },
-            "/search/product": {
-                "method": "POST", 
-                "description": "Search for SDS by product name(s) across all databases",
-                "parameters": {
-                    "product_names": "List of product names (required)",
-                    "download": "Boolean to download files (optional, default: false)"
-                },
-                "response": "Same structure as /search/cas but with product_name field"
+# Cache of search results keyed by (query, search_type), like the caches below
+# searches that found nothing while a database failed expire sooner
+SEARCH_CACHE = TTLCache(maxsize=10_000, ttl=SEARCH_CACHE_TTL)
+SEARCH_ERROR_CACHE = TTLCache(maxsize=10_000, ttl=SEARCH_ERROR_CACHE_TTL)
+SEARCH_CACHE_LOCK = threading.Lock()
+# Told apart from a cached None, which means nothing was found
+_NOT_CACHED = object()
+# Cache of the results of all databases keyed by (search_type, query with
+# whitespace collapsed and lower-cased), results with failed databases
+# expire sooner so transient errors aren't kept
+SOURCES_CACHE = TTLCache(maxsize=4096, ttl=SEARCH_CACHE_TTL)
+SOURCES_ERROR_CACHE = TTLCache(maxsize=4096, ttl=SEARCH_ERROR_CACHE_TTL)
+SOURCES_CACHE_LOCK = threading.Lock()
+# Searches currently running keyed like SOURCES_CACHE, so identical queries arriving
+# at the same time share one search instead of each querying every database
+SOURCES_IN_FLIGHT: Dict[tuple, Future] = {}
+
+# Workers searching for CAS numbers and product names, shared by all requests to avoid
+# starting new threads for every request. Searches submit their database queries
+# to SOURCE_EXECUTOR, a separate pool, so they never wait on their own pool
+SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="sds-search")
+# Workers querying the individual databases
+SOURCE_EXECUTOR = ThreadPoolExecutor(max_workers=SOURCE_WORKERS, thread_name_prefix="sds-source")
+# Drop queued searches on shutdown instead of running them for nobody
+atexit.register(SEARCH_EXECUTOR.shutdown, wait=False, cancel_futures=True)
+atexit.register(SOURCE_EXECUTOR.shutdown, wait=False, cancel_futures=True)
+# Limits the number of SDS files downloaded at the same time across all workers
+DOWNLOAD_SEMAPHORE = threading.BoundedSemaphore(MAX_CONCURRENT_DOWNLOADS)
+
+# Background workers for bulk CAS downloads, so they don't hold up request handlers
+BULK_DOWNLOAD_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sds-bulk")
+
+HEADERS = {
+    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36'
+}
+
+# Shared HTTP session so downloads reuse pooled keep-alive connections
+# instead of opening a new TCP/TLS connection for every file
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+_adapter = HTTPAdapter(
+    pool_connections=32,  # Number of hosts connections are kept open to
+    pool_maxsize=64,  # Connections kept open per host
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+)
+SESSION.mount('https://', _adapter)
+SESSION.mount('http://', _adapter)
+
+@dataclass
+class SearchRequest:
+    """Validated body of a search request"""
+    cas_numbers: List[str] = field(default_factory=list)
+    product_names: List[str] = field(default_factory=list)
+    download: bool = False
+    first_hit_only: bool = False
+
+def _as_string_list(data: Dict, name: str) -> List[str]:
+    """Get a request field that can be a single string or a list of strings as a list"""
+    value = data.get(name)
+    if not value:
+        return []
+    
+    values = value if isinstance(value, list) else [value]
+    if not all(isinstance(item, str) for item in values):
+        raise BadRequest(f"{name} must be a string or a list of strings")
+    
+    return values
+
+def parse_search_request(required_field: Optional[str] = None) -> SearchRequest:
+    """
+    Parse and validate the JSON body of a search request
+    
+    The raw body is decoded with orjson in one step and checked once here,
+    instead of each endpoint probing and coercing the fields itself.
+    
+    Args:
+        required_field: 'cas_numbers' or 'product_names' if the endpoint requires
+            that field, None if either of them is enough
+    
+    Returns:
+        The validated search request
+    
+    Raises:
+        BadRequest: if the body is missing or invalid, answered with a 400 response
+    """
+    try:
+        data = orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        raise BadRequest("Request body must be valid JSON")
+    
+    if not data or not isinstance(data, dict):
+        raise BadRequest("Request body is required")
+    
+    if required_field and required_field not in data:
+        raise BadRequest(f"{required_field} parameter is required")
+    
+    # Strings like "false" would be truthy, so only JSON booleans are accepted
+    download = data.get('download', False)
+    if not isinstance(download, bool):
+        raise BadRequest("download must be a boolean")
+    
+    search = SearchRequest(
+        cas_numbers=[cas_nr.strip() for cas_nr in _as_string_list(data, 'cas_numbers')],
+        product_names=_as_string_list(data, 'product_names'),
+        download=download,
+        # ?fast=1 only waits for the first database that has the SDS
+        first_hit_only=request.args.get('fast', '').lower() in ('1', 'true', 'yes')
+    )
+    
+    if not required_field and not search.cas_numbers and not search.product_names:
+        raise BadRequest("Either cas_numbers or product_names must be provided")
+    
+    return search
+
+# The documentation served at / never changes, so it is serialized once
+API_DOCS = {
+    "message": "SDS Finder API",
+    "version": "3.0.0",
+    "description": "Search for Safety Data Sheets by CAS number or product name across multiple databases",
+    "features": [
+        "Searches across 6 major chemical databases: ChemBlink, VWR/Avantor, Fisher Scientific, TCI, ChemicalSafety, Fluorochem",
+        "Returns ALL available results from each database, not just the first match",
+        "Supports both CAS number and product name searches",
+        "Provides detailed status information for each database searched",
+        "Add ?fast=1 to a search URL to only wait for the first database that has the SDS; databases that had not answered are reported as 'cancelled'"
+    ],
+    "endpoints": {
+        "/search/cas": {
+            "method": "POST",
+            "description": "Search for SDS by CAS number(s) across all databases",
+            "parameters": {
+                "cas_numbers": "List of CAS numbers (required)",
+                "download": "Boolean to download files (optional, default: false). Downloads run in the background: responds with 202 and a status_url to poll"
             },
-            "/search/mixed": {
-                "method": "POST",
-                "description": "Search for SDS by both CAS numbers and product names",
-                "parameters": {
-                    "cas_numbers": "List of CAS numbers (optional)",
-                    "product_names": "List of product names (optional)", 
-                    "download": "Boolean to download files (optional, default: false)"
-                },
-                "response": "Combined results with type field indicating 'cas' or 'product'"
+            "response": {
+                "results": [
+                    {
+                        "cas_number": "string",
+                        "found": "boolean",
+                        "sources": "array of successful sources with URLs",
+                        "all_sources": "array showing status of all databases searched",
+                        "primary_source": "string (first successful source)",
+                        "primary_url": "string (URL from primary source)"
+                    }
+                ]
             }
         },
-        "databases_searched": {
-            "ChemBlink": "CAS and product name searches",
-            "VWR/Avantor": "CAS and product name searches", 
-            "Fisher Scientific": "CAS and product name searches",
-            "TCI Chemicals": "CAS and product name searches",
-            "ChemicalSafety": "CAS and product name searches",
-            "Fluorochem": "CAS and product name searches"
+        "/search/product": {
+            "method": "POST", 
+            "description": "Search for SDS by product name(s) across all databases",
+            "parameters": {
+                "product_names": "List of product names (required)",
+                "download": "Boolean to download files (optional, default: false)"
+            },
+            "response": "Same structure as /search/cas but with product_name field"
+        },
+        "/search/mixed": {
+            "method": "POST",
+            "description": "Search for SDS by both CAS numbers and product names",
+            "parameters": {
+                "cas_numbers": "List of CAS numbers (optional)",
+                "product_names": "List of product names (optional)", 
+                "download": "Boolean to download files (optional, default: false)"
+            },
+            "response": "Combined results with type field indicating 'cas' or 'product'"
+        },
+        "/status/<request_id>": {
+            "method": "GET",
+            "description": "Status of a background CAS download started with /search/cas and download: true",
+            "response": "status ('queued', 'running', 'finished' or 'failed'), with results, total_searched and found_count once finished"
         }
-    })
+    },
+    "databases_searched": {
+        "ChemBlink": "CAS and product name searches",
+        "VWR/Avantor": "CAS and product name searches", 
+        "Fisher Scientific": "CAS and product name searches",
+        "TCI Chemicals": "CAS and product name searches",
+        "ChemicalSafety": "CAS and product name searches",
+        "Fluorochem": "CAS and product name searches"
+    }
+}
+API_DOCS_JSON = orjson.dumps(API_DOCS, option=orjson.OPT_SORT_KEYS)
+API_DOCS_ETAG = hashlib.sha256(API_DOCS_JSON).hexdigest()
+
+@app.route('/', methods=['GET'])
+def home():
+    """API documentation endpoint"""
+    response = app.response_class(API_DOCS_JSON, mimetype='application/json')
+    response.set_etag(API_DOCS_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    # Answers If-None-Match requests for the same documentation with 304
+    return response.make_conditional(request)
 
 @app.route('/search/cas', methods=['POST'])
 def search_by_cas():
     """Search for SDS by CAS number(s)"""
-    try:
-        data = request.get_json()
-        if not data or 'cas_numbers' not in data:
-            return jsonify({"error": "cas_numbers parameter is required"}), 400
-        
-        cas_numbers = data['cas_numbers']
-        download = data.get('download', False)
-        
-        if not isinstance(cas_numbers, list):
-            cas_numbers = [cas_numbers]
-        
-        # Create unique download directory for this request
-        request_id = str(uuid.uuid4())
-        download_path = TEMP_DIR / request_id
-        
-        results = []
-        
-        if download:
-            # Use existing find_sds function for bulk download
-            find_sds_by_cas(cas_list=cas_numbers, download_path=str(download_path), pool_size=5)
-            
-            # Check which files were downloaded
-            for cas_nr in cas_numbers:
-                file_name = f"{cas_nr}-SDS.pdf"
-                file_path = download_path / file_name
-                
-                results.append({
-                    "cas_number": cas_nr,
-                    "found": file_path.exists(),
-                    "file_path": str(file_path) if file_path.exists() else None,
-                    "download_url": f"/download/{request_id}/{file_name}" if file_path.exists() else None
-                })
-        else:
-            # Just search for URLs without downloading - return ALL results
-            for cas_nr in cas_numbers:
-                all_sources = search_sds_sources_all(cas_nr, search_type="cas")
-                
-                # Filter to only successful results
-                successful_sources = [s for s in all_sources if s["status"] == "success"]
-                
-                results.append({
-                    "cas_number": cas_nr,
-                    "found": len(successful_sources) > 0,
-                    "sources": successful_sources,
-                    "all_sources": all_sources,  # Include status of all databases searched
-                    "primary_source": successful_sources[0]["source"] if successful_sources else None,
-                    "primary_url": successful_sources[0]["url"] if successful_sources else None
-                })
-        
-        return jsonify({
-            "request_id": request_id,
-            "results": results,
-            "total_searched": len(cas_numbers),
-            "found_count": sum(1 for r in results if r['found'])
-        })
-        
-    except Exception as e:
-        return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
+    search = parse_search_request(required_field='cas_numbers')
+    
+    if search.download:
+        return queue_bulk_cas_download(search.cas_numbers)
+    
+    return search_response(search.cas_numbers, [], False, search.first_hit_only, result_key='cas_number')
 
 @app.route('/search/product', methods=['POST'])
 def search_by_product():
     """Search for SDS by product name(s)"""
+    search = parse_search_request(required_field='product_names')
+    return search_response([], search.product_names, search.download, search.first_hit_only,
+                           result_key='product_name')
+
+@app.route('/search/mixed', methods=['POST'])
+def search_mixed():
+    """Search for SDS by both CAS numbers and product names"""
+    search = parse_search_request()
+    return search_response(search.cas_numbers, search.product_names, search.download, search.first_hit_only)
+
+@app.route('/status/<request_id>', methods=['GET'])
+def job_status(request_id):
+    """Get the status of a background bulk download, with its results once finished"""
+    # Checked before it is used in a path, so it can't point outside TEMP_DIR
+    if not REQUEST_ID_PATTERN.fullmatch(request_id):
+        return jsonify({"error": "Request not found"}), 404
+    
     try:
-        data = request.get_json()
-        if not data or 'product_names' not in data:
-            return jsonify({"error": "product_names parameter is required"}), 400
+        status_file = TEMP_DIR / request_id / JOB_STATUS_FILE
+        if not status_file.exists():
+            return jsonify({"error": "Request not found"}), 404
         
-        product_names = data['product_names']
-        download = data.get('download', False)
+        # The file is already the JSON response, it is sent without decoding it
+        return app.response_class(status_file.read_bytes(), mimetype='application/json')
+    
+    except OSError:
+        app.logger.exception("Reading the status of %s failed", request_id)
+        return jsonify({"error": "Internal server error", "request_id": request_id}), 500
+
+@app.route('/download/<request_id>/<filename>', methods=['GET'])
+def download_file(request_id, filename):
+    """Download a previously found SDS file"""
+    if not REQUEST_ID_PATTERN.fullmatch(request_id):
+        return jsonify({"error": "File not found"}), 404
+    
+    try:
+        file_path = TEMP_DIR / request_id / filename
+        # Only files, so '..' can't name the request directory
+        if not file_path.is_file():
+            return jsonify({"error": "File not found"}), 404
         
-        if not isinstance(product_names, list):
-            product_names = [product_names]
+        if X_ACCEL_REDIRECT_PREFIX:
+            # nginx serves the file itself from its internal location
+            response = app.response_class(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+            response.headers['X-Accel-Redirect'] = f"{X_ACCEL_REDIRECT_PREFIX}/{request_id}/{filename}"
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
         
-        # Create unique download directory for this request
-        request_id = str(uuid.uuid4())
-        download_path = TEMP_DIR / request_id
+        # Conditional responses let clients use Range requests to resume large
+        # PDFs and If-None-Match/If-Modified-Since to skip unchanged ones.
+        # With SDS_X_SENDFILE set the front-end server sends the file instead
+        return send_file(
+            file_path,
+            as_attachment=True,
+            download_name=filename,
+            conditional=True,
+            etag=True,
+            last_modified=file_path.stat().st_mtime,
+            max_age=0
+        )
+    
+    except OSError:
+        app.logger.exception("Sending %s of %s failed", filename, request_id)
+        return jsonify({"error": "Internal server error", "request_id": request_id}), 500
+
+def write_job_status(request_id: str, status: str, **fields) -> None:
+    """
+    Record the status of a background job in its request directory
+    
+    The status is kept on disk rather than in memory so that any worker
+    process serving /status/<request_id> can read it.
+    
+    Args:
+        request_id: id of the request the job belongs to
+        status: 'queued', 'running', 'finished' or 'failed'
+        **fields: extra fields to include, e.g. results when finished
+    """
+    status_file = TEMP_DIR / request_id / JOB_STATUS_FILE
+    # Made again if it was deleted, so the status of a job can always be read
+    status_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = status_file.with_suffix('.tmp')
+    tmp_file.write_bytes(orjson.dumps({"request_id": request_id, "status": status, **fields},
+                                      option=orjson.OPT_SORT_KEYS))
+    # Replace atomically so readers never see a partially written file
+    os.replace(tmp_file, status_file)
+
+def run_bulk_cas_download(request_id: str, cas_numbers: List[str]) -> None:
+    """
+    Background job downloading SDS files for a list of CAS numbers
+    
+    Args:
+        request_id: id of the request, files are downloaded into TEMP_DIR / request_id
+        cas_numbers: list of CAS numbers to download
+    """
+    download_path = TEMP_DIR / request_id
+    write_job_status(request_id, "running")
+    
+    try:
+        # Use existing find_sds function for bulk download, invalid CAS numbers
+        # can't have an SDS so the databases aren't asked about them
+        valid_cas_numbers = [cas_nr for cas_nr in cas_numbers if is_valid_cas(cas_nr)]
+        if valid_cas_numbers:
+            find_sds_by_cas(cas_list=valid_cas_numbers, download_path=str(download_path), pool_size=5)
         
-        results = []
+        # Check which files were downloaded, listing the directory once
+        # instead of checking each file separately
+        try:
+            downloaded_files = {entry.name for entry in os.scandir(download_path)}
+        except FileNotFoundError:
+            downloaded_files = set()
         
-        for product_name in product_names:
-            all_sources = search_sds_sources_all(product_name, search_type="product")
-            successful_sources = [s for s in all_sources if s["status"] == "success"]
-            
-            # Use primary (first successful) source for download
-            primary_source = successful_sources[0] if successful_sources else None
-            
-            if primary_source and download:
-                # Download the file
-                download_path.mkdir(exist_ok=True)
-                file_name = f"{product_name.replace(' ', '_').replace('/', '_')}-SDS.pdf"
-                file_path = download_path / file_name
-                
-                try:
-                    import requests
-                    headers = {
-                        'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36'
-                    }
-                    r = requests.get(primary_source["url"], headers=headers, timeout=20)
-                    if r.status_code == 200:
-                        with open(file_path, 'wb') as f:
-                            f.write(r.content)
-                        downloaded = True
-                    else:
-                        downloaded = False
-                except:
-                    downloaded = False
-            else:
-                downloaded = False
-                file_path = None
+        results = []
+        for cas_nr in cas_numbers:
+            file_name = f"{cas_nr}-SDS.pdf"
+            found = file_name in downloaded_files
             
             results.append({
-                "product_name": product_name,
-                "found": len(successful_sources) > 0,
-                "sources": successful_sources,
-                "all_sources": all_sources,
-                "primary_source": primary_source["source"] if primary_source else None,
-                "primary_url": primary_source["url"] if primary_source else None,
-                "downloaded": downloaded if download else None,
-                "download_url": f"/download/{request_id}/{file_path.name}" if downloaded else None
+                "cas_number": cas_nr,
+                "found": found,
+                "file_path": str(download_path / file_name) if found else None,
+                "download_url": f"/download/{request_id}/{file_name}" if found else None
             })
         
-        return jsonify({
-            "request_id": request_id,
-            "results": results,
-            "total_searched": len(product_names),
-            "found_count": sum(1 for r in results if r['found'])
-        })
-        
+        write_job_status(
+            request_id, "finished",
+            results=results,
+            total_searched=len(cas_numbers),
+            found_count=sum(1 for r in results if r['found'])
+        )
+    
     except Exception as e:
-        return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
+        app.logger.exception("Bulk download %s failed", request_id)
+        try:
+            write_job_status(request_id, "failed", error=str(e))
+        except OSError:
+            app.logger.exception("Recording the failure of bulk download %s failed", request_id)
 
-@app.route('/search/mixed', methods=['POST'])
-def search_mixed():
-    """Search for SDS by both CAS numbers and product names"""
+def download_sds_file(url: str, file_path: Path) -> bool:
+    """
+    Download a single SDS file
+    
+    Files are downloaded once into DOWNLOAD_CACHE_DIR and hard linked to
+    file_path, so later requests for the same URL skip the download.
+    
+    Args:
+        url: URL of the SDS file
+        file_path: path to save the file to
+    
+    Returns:
+        True if the file was downloaded, False otherwise
+    """
+    cached_file = DOWNLOAD_CACHE_DIR / f"{hashlib.sha256(url.encode()).hexdigest()}.pdf"
+    
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "Request body is required"}), 400
-        
-        cas_numbers = data.get('cas_numbers', [])
-        product_names = data.get('product_names', [])
-        download = data.get('download', False)
-        
-        if not cas_numbers and not product_names:
-            return jsonify({"error": "Either cas_numbers or product_names must be provided"}), 400
-        
-        # Create unique download directory for this request
-        request_id = str(uuid.uuid4())
-        download_path = TEMP_DIR / request_id
+        if not cached_file.exists():
+            # Downloaded under a unique name first so concurrent downloads of
+            # the same URL never see a partial file
+            part_file = cached_file.with_name(f"{cached_file.stem}.{token_urlsafe(6)}.part")
+            try:
+                if not fetch_file(url, part_file):
+                    return False
+                os.replace(part_file, cached_file)
+            finally:
+                part_file.unlink(missing_ok=True)
         
-        results = []
+        link_file(cached_file, file_path)
+        return True
+    except (requests.RequestException, OSError):
+        return False
+
+def fetch_file(url: str, file_path: Path) -> bool:
+    """
+    Stream a file from a URL to disk
+    
+    Args:
+        url: URL of the file
+        file_path: path to save the file to
+    
+    Returns:
+        True if the file was saved, False if the response was not usable
+    """
+    # Stream the body to disk in chunks instead of holding the whole PDF in memory
+    with DOWNLOAD_SEMAPHORE, SESSION.get(url, timeout=20, stream=True) as r:
+        if r.status_code != 200:
+            return False
+        # Refuse files that would fill up the shared TEMP_DIR
+        if int(r.headers.get('content-length') or 0) > MAX_DOWNLOAD_SIZE:
+            return False
         
-        # Search by CAS numbers
-        if cas_numbers:
-            if not isinstance(cas_numbers, list):
-                cas_numbers = [cas_numbers]
-            
-            for cas_nr in cas_numbers:
-                all_sources = search_sds_sources_all(cas_nr, search_type="cas")
-                successful_sources = [s for s in all_sources if s["status"] == "success"]
+        size = 0
+        # A large write buffer batches the network chunks into a few write() calls
+        with open(file_path, 'wb', buffering=DOWNLOAD_WRITE_BUFFER_SIZE) as f:
+            for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                # The content length can be missing or wrong, so count as well
+                size += len(chunk)
+                if size > MAX_DOWNLOAD_SIZE:
+                    return False
+                f.write(chunk)
+    
+    return True
+
+def link_file(source: Path, target: Path) -> None:
+    """Hard link source to target, copying it if the file system can't link"""
+    target.unlink(missing_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+def queue_bulk_cas_download(cas_numbers: List[str]):
+    """
+    Queue downloading the SDS of several CAS numbers as a background job
+    
+    Bulk downloads can take a long time, so they run in BULK_DOWNLOAD_EXECUTOR
+    and the client polls /status/<request_id> for the results.
+    
+    Args:
+        cas_numbers: CAS numbers to download the SDS of
+    
+    Returns:
+        202 response pointing to the status of the job
+    """
+    # Created up front so errors can be reported with the request id
+    request_id = token_urlsafe(12)
+    
+    try:
+        (TEMP_DIR / request_id).mkdir(parents=True, exist_ok=True)
+        write_job_status(request_id, "queued")
+        BULK_DOWNLOAD_EXECUTOR.submit(run_bulk_cas_download, request_id, cas_numbers)
+    except Exception:
+        app.logger.exception("Search request %s failed", request_id)
+        return jsonify({"error": "Internal server error", "request_id": request_id}), 500
+    
+    return jsonify({
+        "request_id": request_id,
+        "status": "queued",
+        "status_url": f"/status/{request_id}",
+        "total_searched": len(cas_numbers)
+    }), 202
+
+def search_response(cas_numbers: List[str], product_names: List[str], download: bool,
+                    first_hit_only: bool = False, result_key: Optional[str] = None):
+    """
+    Run a search and build the response of a search endpoint
+    
+    Args:
+        cas_numbers: CAS numbers to search for
+        product_names: product names to search for
+        download: whether to download the SDS files
+        first_hit_only: only wait for the first database that has each SDS
+        result_key: if set, each result names its identifier under this key instead
+            of the "type" and "identifier" keys used when searching mixed identifiers
+    
+    Returns:
+        JSON response with the results, or a 500 response if the search failed
+    """
+    # Created up front so errors can be reported with the request id
+    request_id = token_urlsafe(12)
+    
+    try:
+        response = run_search(cas_numbers, product_names, download, request_id, first_hit_only)
+    except Exception:
+        app.logger.exception("Search request %s failed", request_id)
+        return jsonify({"error": "Internal server error", "request_id": request_id}), 500
+    
+    if result_key:
+        for result in response["results"]:
+            del result["type"]
+            result[result_key] = result.pop("identifier")
+    
+    return jsonify(response)
+
+def run_search(cas_numbers: List[str], product_names: List[str], download: bool, request_id: str,
+               first_hit_only: bool = False) -> Dict:
+    """
+    Search for (and download) the SDS of CAS numbers and product names concurrently
+    
+    Each identifier is pure network I/O, so they are processed in SEARCH_EXECUTOR
+    rather than one after another. Duplicate identifiers are only processed once.
+    
+    Args:
+        cas_numbers: CAS numbers to search for
+        product_names: product names to search for
+        download: whether to download the SDS files
+        request_id: id of the request, files are downloaded into TEMP_DIR / request_id
+        first_hit_only: only wait for the first database that has each SDS
+    
+    Returns:
+        Response body with a result entry per identifier, in input order
+    """
+    # Create unique download directory for this request
+    download_path = TEMP_DIR / request_id
+    if download:
+        download_path.mkdir(parents=True, exist_ok=True)
+    
+    identifiers = [("cas", cas_nr) for cas_nr in cas_numbers]
+    identifiers += [("product", product_name) for product_name in product_names]
+    
+    unique_identifiers = list(dict.fromkeys(identifiers))
+    outcomes = SEARCH_EXECUTOR.map(
+        lambda item: search_one(item[1], item[0], download, download_path, request_id, first_hit_only),
+        unique_identifiers
+    )
+    results_by_identifier = dict(zip(unique_identifiers, outcomes))
+    results = [
+        {"type": kind, "identifier": identifier, **results_by_identifier[(kind, identifier)]}
+        for kind, identifier in identifiers
+    ]
+    
+    return {
+        "request_id": request_id,
+        "results": results,
+        "total_searched": len(identifiers),
+        "found_count": sum(1 for r in results if r['found'])
+    }
+
+def search_one(identifier: str, kind: str, download: bool, download_path: Path, request_id: str,
+               first_hit_only: bool = False) -> Dict:
+    """
+    Search for the SDS of a single CAS number or product name and download it if requested
+    
+    Args:
+        identifier: CAS number or product name to search for
+        kind: "cas" or "product"
+        download: whether to download the SDS from the primary source
+        download_path: directory to download the file into
+        request_id: id of the current request, used to build the download URL
+        first_hit_only: only wait for the first database that has the SDS
+    
+    Returns:
+        Result entry for the identifier, without the identifier itself
+    """
+    if kind == "cas" and not is_valid_cas(identifier):
+        # Malformed or mistyped CAS numbers can't be found, skip the databases
+        return {
+            "found": False,
+            "sources": [],
+            "all_sources": [],
+            "primary_source": None,
+            "primary_url": None,
+            "downloaded": False if download else None,
+            "download_url": None,
+            "error": "Invalid CAS number"
+        }
+    
+    all_sources = search_sds_sources_all(identifier, search_type=kind, first_hit_only=first_hit_only)
+    successful_sources = [s for s in all_sources if s["status"] == "success"]
+    
+    # Use primary (first successful) source for download
+    primary_source = successful_sources[0] if successful_sources else None
+    
+    downloaded = False
+    download_url = None
+    if primary_source and download:
+        if kind == "cas":
+            file_name = f"{identifier}-SDS.pdf"
+            downloaded = download_sds(identifier, str(download_path))[1]
+        else:
+            file_name = f"{identifier.replace(' ', '_').replace('/', '_')}-SDS.pdf"
+            downloaded = download_sds_file(primary_source["url"], download_path / file_name)
+        download_url = f"/download/{request_id}/{file_name}" if downloaded else None
+    
+    return {
+        "found": len(successful_sources) > 0,
+        "sources": successful_sources,
+        "all_sources": all_sources,
+        "primary_source": primary_source["source"] if primary_source else None,
+        "primary_url": primary_source["url"] if primary_source else None,
+        "downloaded": downloaded if download else None,
+        "download_url": download_url
+    }
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting how often a website is queried
+    
+    Tokens are added at `rate` per second up to `capacity`; each query takes
+    one token, waiting for it if the bucket is empty.
+    """
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Take a token, blocking until one is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
                 
-                if successful_sources and download:
-                    # Use existing download_sds function
-                    download_path.mkdir(exist_ok=True)
-                    cas_result = download_sds(cas_nr, str(download_path))
-                    downloaded = cas_result[1]
-                    file_name = f"{cas_nr}-SDS.pdf"
-                    file_path = download_path / file_name
-                else:
-                    downloaded = False
-                    file_path = None
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
                 
-                results.append({
-                    "type": "cas",
-                    "identifier": cas_nr,
-                    "found": len(successful_sources) > 0,
-                    "sources": successful_sources,
-                    "all_sources": all_sources,
-                    "primary_source": successful_sources[0]["source"] if successful_sources else None,
-                    "primary_url": successful_sources[0]["url"] if successful_sources else None,
-                    "downloaded": downloaded if download else None,
-                    "download_url": f"/download/{request_id}/{file_name}" if downloaded else None
-                })
-        
-        # Search by product names
-        if product_names:
-            if not isinstance(product_names, list):
-                product_names = [product_names]
+                wait = (1 - self.tokens) / self.rate
             
-            for product_name in product_names:
-                all_sources = search_sds_sources_all(product_name, search_type="product")
-                successful_sources = [s for s in all_sources if s["status"] == "success"]
-                primary_source = successful_sources[0] if successful_sources else None
-                
-                if primary_source and download:
-                    # Download the file
-                    download_path.mkdir(exist_ok=True)
-                    file_name = f"{product_name.replace(' ', '_').replace('/', '_')}-SDS.pdf"
-                    file_path = download_path / file_name
-                    
-                    try:
-                        import requests
-                        headers = {
-                            'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36'
-                        }
-                        r = requests.get(primary_source["url"], headers=headers, timeout=20)
-                        if r.status_code == 200:
-                            with open(file_path, 'wb') as f:
-                                f.write(r.content)
-                            downloaded = True
-                        else:
-                            downloaded = False
-                    except:
-                        downloaded = False
-                else:
-                    downloaded = False
-                    file_path = None
-                
-                results.append({
-                    "type": "product",
-                    "identifier": product_name,
-                    "found": len(successful_sources) > 0,
-                    "sources": successful_sources,
-                    "all_sources": all_sources,
-                    "primary_source": primary_source["source"] if primary_source else None,
-                    "primary_url": primary_source["url"] if primary_source else None,
-                    "downloaded": downloaded if download else None,
-                    "download_url": f"/download/{request_id}/{file_path.name}" if downloaded else None
-                })
-        
-        return jsonify({
-            "request_id": request_id,
-            "results": results,
-            "total_searched": len(cas_numbers) + len(product_names),
-            "found_count": sum(1 for r in results if r['found'])
-        })
-        
-    except Exception as e:
-        return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
+            time.sleep(wait)
 
-@app.route('/download/<request_id>/<filename>', methods=['GET'])
-def download_file(request_id, filename):
-    """Download a previously found SDS file"""
+# Maximum queries per second sent to each database, shared by all requests
+# so bursts of searches don't get the server rate limited or blocked. A capacity
+# of one spaces the queries evenly, at least 1 / rate seconds apart
+SOURCE_RATE_LIMITS = {
+    "ChemBlink": TokenBucket(rate=10, capacity=1),
+    "VWR": TokenBucket(rate=5, capacity=1),
+    "Fisher": TokenBucket(rate=5, capacity=1),
+    "TCI": TokenBucket(rate=5, capacity=1),
+    "ChemicalSafety": TokenBucket(rate=5, capacity=1),
+    "Fluorochem": TokenBucket(rate=5, capacity=1)
+}
+
+# Maximum queries in flight to each database at the same time, so one slow
+# database can't tie up all source workers or get hit with a burst of connections
+MAX_QUERIES_PER_SOURCE = 4
+SOURCE_CONCURRENCY_LIMITS = {
+    source_name: threading.BoundedSemaphore(MAX_QUERIES_PER_SOURCE)
+    for source_name in SOURCE_RATE_LIMITS
+}
+
+def call_source(source_name: str, source_func, query: str) -> Optional[tuple]:
+    """
+    Call a source search function, waiting for the rate and concurrency limits of its database
+    
+    Args:
+        source_name: name of the database, as listed in get_sds_sources
+        source_func: search function of the database
+        query: CAS number or product name to search for
+    
+    Returns:
+        The result of source_func
+    """
+    with SOURCE_CONCURRENCY_LIMITS[source_name]:
+        SOURCE_RATE_LIMITS[source_name].acquire()
+        return source_func(query)
+
+# Databases searched for each search type with their search functions
+CAS_SOURCES = (
+    ("ChemBlink", extract_download_url_from_chemblink),
+    ("VWR", extract_download_url_from_vwr),
+    ("Fisher", extract_download_url_from_fisher),
+    ("TCI", extract_download_url_from_tci),
+    ("ChemicalSafety", extract_download_url_from_chemicalsafety),
+    ("Fluorochem", extract_download_url_from_fluorochem)
+)
+PRODUCT_SOURCES = (
+    ("ChemicalSafety", extract_download_url_from_chemicalsafety_by_name),
+    ("VWR", extract_download_url_from_vwr_by_name),
+    ("Fisher", extract_download_url_from_fisher_by_name),
+    ("TCI", extract_download_url_from_tci_by_name),
+    ("ChemBlink", extract_download_url_from_chemblink_by_name),
+    ("Fluorochem", extract_download_url_from_fluorochem_by_name)
+)
+SOURCES_BY_SEARCH_TYPE = {"cas": CAS_SOURCES, "product": PRODUCT_SOURCES}
+
+def get_sds_sources(search_type: str = "cas") -> tuple:
+    """
+    Get the SDS sources to search for a given search type
+    
+    Args:
+        search_type: "cas" or "product" to indicate search type
+    
+    Returns:
+        Tuple of (database name, search function) tuples, empty if search_type is unknown
+    """
+    return SOURCES_BY_SEARCH_TYPE.get(search_type, ())
+
+# Errors of a database search that are reported as a failed source, anything
+# else is a bug and is raised instead of hidden in the results
+SOURCE_ERRORS = (requests.RequestException, ValueError, KeyError, AttributeError)
+
+def search_source(source_name: str, source_func, query: str) -> Dict:
+    """
+    Search a single SDS source for a given query
+    
+    Args:
+        source_name: name of the database, as listed in get_sds_sources
+        source_func: search function of the database
+        query: CAS number or product name to search for
+    
+    Returns:
+        Dictionary with the source info, as listed in search_sds_sources_all
+    """
     try:
-        file_path = TEMP_DIR / request_id / filename
-        if not file_path.exists():
-            return jsonify({"error": "File not found"}), 404
-        
-        return send_file(str(file_path), as_attachment=True, download_name=filename)
+        result = call_source(source_name, source_func, query)
+    except SOURCE_ERRORS as e:
+        return {
+            "source": None,
+            "database": source_name,
+            "url": None,
+            "status": "error",
+            "error": str(e)
+        }
     
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    if result:  # If source returns a valid tuple (source, url)
+        return {
+            "source": result[0],  # Use the actual source name returned by function
+            "database": source_name,  # Database that was searched
+            "url": result[1],
+            "status": "success"
+        }
+    
+    return {
+        "source": None,
+        "database": source_name,
+        "url": None,
+        "status": "not_found"
+    }
 
-def search_sds_sources_all(query: str, search_type: str = "cas") -> List[Dict]:
+def search_sds_sources_all(query: str, search_type: str = "cas", first_hit_only: bool = False) -> List[Dict]:
     """
     Search ALL SDS sources for a given query and return all found results
     
+    Results are cached for SEARCH_CACHE_TTL seconds, or SEARCH_ERROR_CACHE_TTL
+    seconds if a database failed, so repeated lookups skip the scrapers.
+    Concurrent lookups of the same query share a single search.
+    
     Args:
         query: CAS number or product name to search for
         search_type: "cas" or "product" to indicate search type
+        first_hit_only: stop as soon as one source found the SDS, sources that
+            had not answered yet are reported as 'cancelled' and nothing is cached
     
     Returns:
         List of dictionaries with source info, each containing:
         - source: source name
         - url: download URL
-        - status: 'success' or 'error'
+        - status: 'success', 'not_found', 'error' or 'cancelled'
         - error: error message if status is 'error'
     """
+    sources = get_sds_sources(search_type)
+    if not sources:
+        return []
     
-    # Enable debug mode for better error handling
-    import find_sds.find_sds as sds_module
-    sds_module.debug = False  # Reduce noise in production
+    key = (search_type, " ".join(query.split()).lower())
+    with SOURCES_CACHE_LOCK:
+        cached_results = SOURCES_CACHE.get(key) or SOURCES_ERROR_CACHE.get(key)
+        in_flight = SOURCES_IN_FLIGHT.get(key)
+        if cached_results is None and in_flight is None and not first_hit_only:
+            SOURCES_IN_FLIGHT[key] = pending = Future()
     
-    results = []
+    # Copied so callers can't change the cached results
+    if cached_results is not None:
+        return copy.deepcopy(cached_results)
+    if first_hit_only:
+        return search_first_hit(sources, query)
+    if in_flight is not None:
+        # The same query is already being searched, wait for its results
+        return copy.deepcopy(in_flight.result())
     
-    if search_type == "cas":
-        # CAS-based search functions with their names
-        sources = [
-            ("ChemBlink", extract_download_url_from_chemblink),
-            ("VWR", extract_download_url_from_vwr),
-            ("Fisher", extract_download_url_from_fisher),
-            ("TCI", extract_download_url_from_tci),
-            ("ChemicalSafety", extract_download_url_from_chemicalsafety),
-            ("Fluorochem", extract_download_url_from_fluorochem)
-        ]
-        
-    elif search_type == "product":
-        # Product name search functions with their names
-        sources = [
-            ("ChemicalSafety", extract_download_url_from_chemicalsafety_by_name),
-            ("VWR", extract_download_url_from_vwr_by_name),
-            ("Fisher", extract_download_url_from_fisher_by_name),
-            ("TCI", extract_download_url_from_tci_by_name),
-            ("ChemBlink", extract_download_url_from_chemblink_by_name),
-            ("Fluorochem", extract_download_url_from_fluorochem_by_name)
-        ]
-    else:
-        return []
+    try:
+        # Query every source at the same time, map keeps the results in source order
+        results = list(SOURCE_EXECUTOR.map(
+            lambda source: search_source(source[0], source[1], query),
+            sources
+        ))
+    except BaseException as e:
+        with SOURCES_CACHE_LOCK:
+            del SOURCES_IN_FLIGHT[key]
+        pending.set_exception(e)
+        raise
     
-    # Try each source and collect all results
-    for source_name, source_func in sources:
-        try:
-            result = source_func(query)
-            if result:  # If source returns a valid tuple (source, url)
-                results.append({
-                    "source": result[0],  # Use the actual source name returned by function
-                    "database": source_name,  # Database that was searched
-                    "url": result[1],
-                    "status": "success"
-                })
-            else:
-                results.append({
-                    "source": None,
-                    "database": source_name,
-                    "url": None,
-                    "status": "not_found"
-                })
-        except Exception as e:
+    cache = SOURCES_ERROR_CACHE if any(r["status"] == "error" for r in results) else SOURCES_CACHE
+    # The waiting requests get the same copy as the cache, it isn't read back
+    # from the cache where it could already have been evicted
+    cached_results = copy.deepcopy(results)
+    with SOURCES_CACHE_LOCK:
+        cache[key] = cached_results
+        del SOURCES_IN_FLIGHT[key]
+    pending.set_result(cached_results)
+    
+    return results
+
+def search_first_hit(sources: tuple, query: str) -> List[Dict]:
+    """
+    Search SDS sources concurrently until one of them finds the SDS
+    
+    Sources that have not started yet are cancelled and the ones still running
+    are not waited for.
+    
+    Args:
+        sources: (database name, search function) tuples to search
+        query: CAS number or product name to search for
+    
+    Returns:
+        List of dictionaries with source info in source order, as listed in
+        search_sds_sources_all
+    """
+    futures = [
+        SOURCE_EXECUTOR.submit(search_source, source_name, source_func, query)
+        for source_name, source_func in sources
+    ]
+    
+    for future in as_completed(futures):
+        if future.result()["status"] == "success":
+            break
+    
+    results = []
+    for (source_name, _), future in zip(sources, futures):
+        if future.done() and not future.cancelled():
+            results.append(future.result())
+        else:
+            future.cancel()
             results.append({
                 "source": None,
                 "database": source_name,
                 "url": None,
-                "status": "error",
-                "error": str(e)
+                "status": "cancelled"
             })
     
     return results
@@ -428,25 +943,122 @@ def search_sds_sources_all(query: str, search_type: str = "cas") -> List[Dict]:
 def search_sds_sources(query: str, search_type: str = "cas") -> Optional[tuple]:
     """
     Legacy function - returns first successful result for compatibility
+    
+    All sources are searched concurrently and the first source to return a
+    result wins, see search_first_hit.
+    
+    Results, including None when nothing was found, are cached for
+    SEARCH_CACHE_TTL seconds so repeated lookups skip the scrapers. When
+    nothing was found and a database failed, the None is only cached for
+    SEARCH_ERROR_CACHE_TTL seconds, so a transient error isn't reported as
+    not found for long.
     """
-    all_results = search_sds_sources_all(query, search_type)
+    key = (query, search_type)
+    with SEARCH_CACHE_LOCK:
+        for cache in (SEARCH_CACHE, SEARCH_ERROR_CACHE):
+            found = cache.get(key, _NOT_CACHED)
+            if found is not _NOT_CACHED:
+                return found
     
-    # Return first successful result for backward compatibility
-    for result in all_results:
-        if result["status"] == "success":
-            return (result["source"], result["url"])
+    results = search_sds_sources_all(query, search_type, first_hit_only=True)
+    found = next(((result["source"], result["url"]) for result in results if result["status"] == "success"), None)
+    failed = found is None and any(result["status"] == "error" for result in results)
     
-    return None
+    with SEARCH_CACHE_LOCK:
+        (SEARCH_ERROR_CACHE if failed else SEARCH_CACHE)[key] = found
+    return found
 
-# Import product name search functions
-from find_sds.enhanced_search import (
-    extract_download_url_from_chemicalsafety_by_name,
-    extract_download_url_from_vwr_by_name,
-    extract_download_url_from_fisher_by_name,
-    extract_download_url_from_tci_by_name,
-    extract_download_url_from_chemblink_by_name,
-    extract_download_url_from_fluorochem_by_name
-)
+# Set the scrapers' debug mode once at startup rather than on every search,
+# off by default to reduce noise in production
+import find_sds.find_sds as sds_module
+sds_module.debug = os.environ.get('SDS_DEBUG', '').lower() in ('1', 'true', 'yes')
+_scraper_logger = logging.getLogger('find_sds.enhanced_search')
+_scraper_logger.addHandler(QueueHandler(_log_queue))
+_scraper_logger.setLevel(logging.DEBUG if sds_module.debug else logging.WARNING)
+
+def is_active_job(request_dir: str) -> bool:
+    """
+    Check whether a request directory belongs to a bulk download that is queued or running
+    
+    The status file is read rather than keeping a set of jobs in memory, as
+    every worker process cleans up the directories of all of them. A job that
+    hasn't finished after JOB_STALE_AFTER seconds is assumed to be lost with
+    its worker.
+    
+    Args:
+        request_dir: path of the request directory
+    
+    Returns:
+        True if the directory must be kept for its job
+    """
+    status_file = Path(request_dir) / JOB_STATUS_FILE
+    try:
+        if time.time() - status_file.stat().st_mtime > JOB_STALE_AFTER:
+            return False
+        return orjson.loads(status_file.read_bytes()).get("status") in ("queued", "running")
+    except (OSError, ValueError, AttributeError):
+        return False
+
+def sweep_temp_dir() -> None:
+    """
+    Delete request directories and shared downloads in TEMP_DIR that are older
+    than TEMP_DIR_TTL, then the oldest ones until TEMP_DIR_MAX_SIZE is respected
+    
+    Directories of bulk downloads that are queued or running are never deleted.
+    """
+    cutoff = time.time() - TEMP_DIR_TTL
+    kept = []
+    
+    for entry in chain(os.scandir(TEMP_DIR), os.scandir(DOWNLOAD_CACHE_DIR)):
+        if entry.path == str(DOWNLOAD_CACHE_DIR):
+            continue
+        
+        try:
+            mtime = entry.stat().st_mtime
+            if entry.is_dir():
+                if is_active_job(entry.path):
+                    continue
+                if mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                    kept.append((mtime, size, entry))
+            elif entry.path.startswith(str(DOWNLOAD_CACHE_DIR)):
+                if mtime < cutoff:
+                    os.unlink(entry.path)
+                else:
+                    kept.append((mtime, entry.stat().st_size, entry))
+        except OSError:
+            # Removed by another worker in the meantime
+            continue
+    
+    # Hard linked files are counted once per link, which errs on the side of cleaning up
+    total_size = sum(size for _, size, _ in kept)
+    for _, size, entry in sorted(kept, key=lambda item: item[0]):
+        if total_size <= TEMP_DIR_MAX_SIZE:
+            break
+        if entry.is_dir():
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            Path(entry.path).unlink(missing_ok=True)
+        total_size -= size
+
+def sweep_temp_dir_forever() -> None:
+    """Run sweep_temp_dir every TEMP_DIR_SWEEP_INTERVAL seconds"""
+    while True:
+        try:
+            sweep_temp_dir()
+        except Exception:
+            app.logger.exception("Cleaning up %s failed", TEMP_DIR)
+        
+        time.sleep(TEMP_DIR_SWEEP_INTERVAL)
+
+# Clean up old downloads in the background, in every worker process
+threading.Thread(target=sweep_temp_dir_forever, name="sds-janitor", daemon=True).start()
+
+@app.errorhandler(400)
+def bad_request(error):
+    return jsonify({"error": error.description}), 400
 
 @app.errorhandler(404)
 def not_found(error):
@@ -457,4 +1069,11 @@ def internal_error(error):
     return jsonify({"error": "Internal server error"}), 500
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server only, serve wsgi:app with gunicorn in production.
+    # Debug mode is opt-in through FLASK_DEBUG
+    app.run(
+        debug=os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes'),
+        host='0.0.0.0',
+        port=5000,
+        threaded=True
+    )
@@ -5,9 +5,9 @@ Shows both the original library usage and new API capabilities
 """
 
 import requests
-import json
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 def demo_library_usage():
@@ -41,9 +41,12 @@ def demo_api_usage(base_url="http://localhost:5000"):
     print("DEMO: New API Functionality")
     print("=" * 60)
     
+    # One session for all the requests, so the connection to the API is reused
+    session = requests.Session()
+    
     # Test if API is running
     try:
-        response = requests.get(f"{base_url}/", timeout=5)
+        response = session.get(f"{base_url}/", timeout=5)
         if response.status_code != 200:
             print(f"API not responding at {base_url}")
             print("Start the API with: python run_server.py")
@@ -55,16 +58,33 @@ def demo_api_usage(base_url="http://localhost:5000"):
     
     print(f"API running at: {base_url}")
     
-    # Demo 1: CAS number search
-    print("\n1. Searching by CAS numbers...")
     cas_data = {
         "cas_numbers": ["67-63-0", "75-09-2"],
         "download": False
     }
+    product_data = {
+        "product_names": ["Isopropanol", "Acetone"],
+        "download": False
+    }
+    mixed_data = {
+        "cas_numbers": ["67-63-0"],
+        "product_names": ["Benzene"],
+        "download": False
+    }
+    
+    # The first three searches don't depend on each other, so they are sent
+    # at the same time and their results are shown in order
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        cas_search, product_search, mixed_search = [
+            executor.submit(session.post, f"{base_url}{path}", json=search_data)
+            for path, search_data in (("/search/cas", cas_data),
+                                      ("/search/product", product_data),
+                                      ("/search/mixed", mixed_data))
+        ]
     
-    response = requests.post(f"{base_url}/search/cas", 
-                           headers={"Content-Type": "application/json"},
-                           data=json.dumps(cas_data))
+    # Demo 1: CAS number search
+    print("\n1. Searching by CAS numbers...")
+    response = cas_search.result()
     
     if response.status_code == 200:
         data = response.json()
@@ -78,14 +98,7 @@ def demo_api_usage(base_url="http://localhost:5000"):
     
     # Demo 2: Product name search
     print("\n2. Searching by product names...")
-    product_data = {
-        "product_names": ["Isopropanol", "Acetone"],
-        "download": False
-    }
-    
-    response = requests.post(f"{base_url}/search/product",
-                           headers={"Content-Type": "application/json"},
-                           data=json.dumps(product_data))
+    response = product_search.result()
     
     if response.status_code == 200:
         data = response.json()
@@ -99,15 +112,7 @@ def demo_api_usage(base_url="http://localhost:5000"):
     
     # Demo 3: Mixed search
     print("\n3. Mixed search (CAS + Product names)...")
-    mixed_data = {
-        "cas_numbers": ["67-63-0"],
-        "product_names": ["Benzene"],
-        "download": False
-    }
-    
-    response = requests.post(f"{base_url}/search/mixed",
-                           headers={"Content-Type": "application/json"},
-                           data=json.dumps(mixed_data))
+    response = mixed_search.result()
     
     if response.status_code == 200:
         data = response.json()
@@ -129,11 +134,17 @@ def demo_api_usage(base_url="http://localhost:5000"):
     }
     
     print("   Downloading SDS file...")
-    response = requests.post(f"{base_url}/search/cas",
-                           headers={"Content-Type": "application/json"},
-                           data=json.dumps(download_data))
+    response = session.post(f"{base_url}/search/cas", json=download_data)
     
-    if response.status_code == 200:
+    # Downloads run in the background, poll the status URL until they finish
+    if response.status_code == 202:
+        status_url = f"{base_url}{response.json()['status_url']}"
+        response = session.get(status_url)
+        while response.status_code == 200 and response.json()['status'] in ('queued', 'running'):
+            time.sleep(2)
+            response = session.get(status_url)
+    
+    if response.status_code == 200 and response.json()['status'] == 'finished':
         data = response.json()
         for result in data['results']:
             if result['found'] and result.get('download_url'):
@@ -3,18 +3,158 @@ Enhanced search functionality for finding SDS by product name
 Extends the existing CAS-based search capabilities
 """
 
-import json
+import functools
+import logging
 import re
-import traceback
-from typing import Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
 from urllib.parse import quote
 
-import requests
-from bs4 import BeautifulSoup
+import orjson
+from bs4 import BeautifulSoup, SoupStrainer
+from cachetools import TTLCache
+
+from find_sds.find_sds import (
+    extract_download_url_from_chemblink,
+    SESSION,
+    pooled_session,
+    HTML_PARSER,
+    is_pdf_url,
+    ENCODED_CONTEXT_PATH_VALUE_PATTERN,
+    HIT_COUNT_PATTERN,
+    SEARCH_TIMEOUT,
+    USER_AGENT,
+    DEFAULT_HEADERS,
+    CHEMICALSAFETY_HEADERS,
+    FISHER_HEADERS,
+    TCI_HEADERS,
+    FILENAME_PATTERN,
+    TCI_RESULTS_STRAINER,
+    read_tci_csrf_token
+)
+
+# Parse streamed pages incrementally with lxml when it is installed
+try:
+    from lxml.etree import HTMLPullParser
+except ImportError:
+    HTMLPullParser = None
+
+# Searches are logged at DEBUG level and failed searches as warnings, with
+# their traceback when DEBUG is enabled. Configured by the application
+logger = logging.getLogger(__name__)
+
+NAME_CACHE_TTL = 3600  # Seconds found SDS are cached for by product name
+
+# Patterns used while scraping, compiled once instead of on every search
+RESULT_COUNT_PATTERN = re.compile(r'(\d+).*results were found')
+CAS_NUMBER_PATTERN = re.compile(rb'\b\d{2,7}-\d{2}-\d\b')
+
+# Request headers of the searches not shared with find_sds.py, built once
+# instead of on every search
+FLUOROCHEM_HEADERS = {
+    'user-agent': USER_AGENT,
+    'Content-Type': 'application/json',
+}
+
+
+def _is_vwr_result_tag(name: str, attrs: dict) -> bool:
+    """Whether a tag of a VWR search page holds the result count or a search result"""
+    classes = attrs.get('class') or ''
+    if isinstance(classes, str):
+        classes = classes.split()
+    return 'clearfix' in classes or (name == 'td' and 'data-title' in attrs)
+
+
+# Only the parts of the search page that are read are turned into a tree,
+# building the tree is most of the time spent parsing a page
+VWR_RESULTS_STRAINER = SoupStrainer(_is_vwr_result_tag)
+
+def _find_first_link_in_class(response, class_name: str) -> Optional[str]:
+    """Read a streamed response until the first link in an element with class_name
+
+    Like ``select('.' + class_name)[0].find_all('a')[0].get('href')``, with
+    lxml the page is parsed as it is downloaded and the rest of it is skipped
+    once the element is found. Without lxml the whole page is parsed, keeping
+    only the elements with class_name
 
-# Global debug flag
-debug = False
+    Parameters
+    ----------
+    response : requests.Response
+        response requested with stream=True, closed once the link is found
+    class_name : str
+        class of the element containing the link
+
+    Returns
+    -------
+    Optional[str]
+        href of the link, None if there is no such link
+    """
+    try:
+        if HTMLPullParser is None:
+            soup = BeautifulSoup(response.content, HTML_PARSER, parse_only=SoupStrainer(class_=class_name))
+            container = soup.find(class_=class_name)
+            link = container.find('a') if container else None
+            return link.get('href') if link else None
+
+        parser = HTMLPullParser(events=('start', 'end'), encoding=response.encoding)
+        container = None
+        for chunk in response.iter_content(chunk_size=16384):
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                if container is None:
+                    if event == 'start' and class_name in (element.get('class') or '').split():
+                        container = element
+                elif event == 'end' and element is container:
+                    # The element ended without a link
+                    return None
+                elif event == 'start' and element.tag == 'a':
+                    # Only links inside the element come before its end, the
+                    # first link decides even without href
+                    return element.get('href')
+        return None
+    finally:
+        response.close()
+
+
+def cache_by_name(extractor: Callable[[str], Optional[Tuple[str, str]]]) -> Callable[[str], Optional[Tuple[str, str]]]:
+    """Cache the SDS found by a product name search for NAME_CACHE_TTL seconds
+    
+    The cache is keyed on the product name with whitespace and case normalized.
+    Only found SDS are cached: the searches also return None when a website
+    fails, and that shouldn't stick for an hour
+    
+    Parameters
+    ----------
+    extractor : Callable[[str], Optional[Tuple[str, str]]]
+        product name search function
+        
+    Returns
+    -------
+    Callable[[str], Optional[Tuple[str, str]]]
+        search function returning cached results for names searched before
+    """
+    cache = TTLCache(maxsize=2048, ttl=NAME_CACHE_TTL)
+    lock = threading.Lock()
+    
+    @functools.wraps(extractor)
+    def cached_extractor(product_name: str) -> Optional[Tuple[str, str]]:
+        key = ' '.join(product_name.split()).casefold()
+        with lock:
+            result = cache.get(key)
+        if result is not None:
+            return result
+        
+        result = extractor(product_name)
+        if result:
+            with lock:
+                cache[key] = result
+        return result
+    
+    cached_extractor.cache = cache
+    return cached_extractor
 
+@cache_by_name
 def extract_download_url_from_chemicalsafety_by_name(product_name: str) -> Optional[Tuple[str, str]]:
     """Search for SDS by product name from ChemicalSafety.com
     
@@ -29,11 +169,7 @@ def extract_download_url_from_chemicalsafety_by_name(product_name: str) -> Optio
         Tuple of (source_name, url) if found, None otherwise
     """
     
-    headers = {
-        'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36',
-        'accept-encoding': 'gzip, deflate, br',
-        'content-type': 'application/json',
-    }
+    headers = CHEMICALSAFETY_HEADERS
     
     extract_info_url = 'https://chemicalsafety.com/sds1/sds_retriever.php?action=search'
     
@@ -49,45 +185,40 @@ def extract_download_url_from_chemicalsafety_by_name(product_name: str) -> Optio
         "ResultColumns": ["revision_date"]
     }
 
-    if debug:
-        print(f'Searching ChemicalSafety for product name: {product_name}')
+    logger.debug('Searching ChemicalSafety for product name: %s', product_name)
 
     try:
-        with requests.Session() as s:
-            r1 = s.post(extract_info_url, headers=headers,
-                        data=json.dumps(form1), timeout=20)
-
-            if r1.status_code == 200 and r1.json():
-                response_data = r1.json()
+        # A single request that needs no cookies, so it goes through the shared session
+        r1 = SESSION.post(extract_info_url, headers=headers,
+                          data=orjson.dumps(form1), timeout=SEARCH_TIMEOUT)
+
+        # The response is decoded once, it can list many products
+        response_data = orjson.loads(r1.content) if r1.status_code == 200 else None
+        rows = response_data.get('rows') if response_data else None
+        if rows:
+            col_indexes = {col['name']: index for index, col in enumerate(response_data.get('cols') or [])}
+            common_col_index = col_indexes['COMMON']
+            manufacture_col_index = col_indexes['MANUFACT']
+            sds_url_col_index = col_indexes['HTTPMSDSREF']
+            
+            # Look for exact or partial matches, the first match is used
+            search_name = product_name.casefold()
+            for row in rows:
+                common_name = (row[common_col_index] or '').casefold()
                 
-                if 'rows' in response_data and response_data['rows']:
-                    cols = [row['name'] for row in response_data['cols']]
-                    common_col_index = cols.index('COMMON')
-                    manufacture_col_index = cols.index('MANUFACT')
-                    sds_url_col_index = cols.index('HTTPMSDSREF')
-                    
-                    # Look for exact or partial matches
-                    matching_compounds = []
-                    for row in response_data['rows']:
-                        common_name = row[common_col_index].lower()
-                        search_name = product_name.lower()
-                        
-                        # Check for exact match or if search term is contained in the product name
-                        if (search_name in common_name or common_name in search_name) and \
-                           re.search(r'^http.+\.pdf$', row[sds_url_col_index]):
-                            matching_compounds.append((row[sds_url_col_index], row[manufacture_col_index]))
-                    
-                    if matching_compounds:
-                        url = matching_compounds[0][0]  # Take first match
-                        manufacture = matching_compounds[0][1]
-                        return manufacture, url
-
-    except Exception as error:
-        if debug:
-            traceback.print_exception(error)
+                # Check for exact match or if search term is contained in the product name,
+                # products without a name would match every search
+                if common_name and (search_name in common_name or common_name in search_name) and \
+                   is_pdf_url(row[sds_url_col_index]):
+                    return row[manufacture_col_index], row[sds_url_col_index]
+
+    except Exception:
+        logger.warning('Searching ChemicalSafety for product name %s failed', product_name,
+                       exc_info=logger.isEnabledFor(logging.DEBUG))
     
     return None
 
+@cache_by_name
 def extract_download_url_from_vwr_by_name(product_name: str) -> Optional[Tuple[str, str]]:
     """Search for SDS by product name from VWR
     
@@ -103,28 +234,25 @@ def extract_download_url_from_vwr_by_name(product_name: str) -> Optional[Tuple[s
     """
     
     adv_search_url = 'https://us.vwr.com/store/msds'
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36',
-    }
+    headers = DEFAULT_HEADERS
     params = {
         'keyword': product_name
     }
 
-    if debug:
-        print(f'Searching VWR for product name: {product_name}')
+    logger.debug('Searching VWR for product name: %s', product_name)
 
     try:
-        with requests.Session() as s1:
-            get_id = s1.get(adv_search_url, headers=headers, params=params, timeout=10)
+        with pooled_session() as s1:
+            get_id = s1.get(adv_search_url, headers=headers, params=params, timeout=SEARCH_TIMEOUT)
 
             if get_id.status_code == 200 and len(get_id.history) == 0:
-                html = BeautifulSoup(get_id.text, 'html.parser')
+                html = BeautifulSoup(get_id.content, HTML_PARSER, parse_only=VWR_RESULTS_STRAINER)
 
                 result_count_css = '.clearfix .pull-left'
                 result_elements = html.select(result_count_css)
                 
                 if result_elements:
-                    result_match = re.search(r'(\d+).*results were found', result_elements[0].text)
+                    result_match = RESULT_COUNT_PATTERN.search(result_elements[0].text)
                     if result_match:
                         result_count = result_match[1]
                         
@@ -144,12 +272,13 @@ def extract_download_url_from_vwr_by_name(product_name: str) -> Optional[Tuple[s
                                     sds_source = sds_manufacturers[0].text.strip()
                                     return sds_source, full_url
 
-    except Exception as error:
-        if debug:
-            traceback.print_exception(error)
+    except Exception:
+        logger.warning('Searching VWR for product name %s failed', product_name,
+                       exc_info=logger.isEnabledFor(logging.DEBUG))
     
     return None
 
+@cache_by_name
 def extract_download_url_from_fisher_by_name(product_name: str) -> Optional[Tuple[str, str]]:
     """Search for SDS by product name from Fisher Scientific
     
@@ -164,13 +293,7 @@ def extract_download_url_from_fisher_by_name(product_name: str) -> Optional[Tupl
         Tuple of (source_name, url) if found, None otherwise
     """
     
-    headers = {
-        'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'same-origin',
-        'Sec-Fetch-User': '?1',
-    }
+    headers = FISHER_HEADERS
 
     extract_info_url = 'https://www.fishersci.com/us/en/catalog/search/sds'
     payload = {
@@ -179,35 +302,28 @@ def extract_download_url_from_fisher_by_name(product_name: str) -> Optional[Tupl
         'msdsKeyword': product_name
     }
 
-    if debug:
-        print(f'Searching Fisher Scientific for product name: {product_name}')
+    logger.debug('Searching Fisher Scientific for product name: %s', product_name)
 
     try:
-        r = requests.get(extract_info_url, headers=headers, timeout=10, params=payload)
+        r = SESSION.get(extract_info_url, headers=headers, timeout=SEARCH_TIMEOUT, params=payload, stream=True)
         
         if r.status_code == 200 and len(r.history) == 0:
-            html = BeautifulSoup(r.text, 'html.parser')
-            
             # Look for the first SDS result
-            # Fisher lists products with their names, we'll take the first match
-            catalog_items = html.select('.catlog_items')
-            
-            if catalog_items:
-                # Get the first available SDS
-                cat_no_items = catalog_items[0].find_all('a')
-                
-                if cat_no_items:
-                    rel_download_url = cat_no_items[0].get('href')
-                    if rel_download_url:
-                        full_url = 'https://www.fishersci.com' + rel_download_url
-                        return 'Fisher', full_url
-
-    except Exception as error:
-        if debug:
-            traceback.print_exception(error)
+            # Fisher lists products with their names, we'll take the first match.
+            # The page is only read up to that result
+            rel_download_url = _find_first_link_in_class(r, 'catlog_items')
+            if rel_download_url:
+                full_url = 'https://www.fishersci.com' + rel_download_url
+                return 'Fisher', full_url
+        r.close()
+
+    except Exception:
+        logger.warning('Searching Fisher Scientific for product name %s failed', product_name,
+                       exc_info=logger.isEnabledFor(logging.DEBUG))
     
     return None
 
+@cache_by_name
 def extract_download_url_from_tci_by_name(product_name: str) -> Optional[Tuple[str, str]]:
     """Search for SDS by product name from TCI Chemicals
     
@@ -224,36 +340,34 @@ def extract_download_url_from_tci_by_name(product_name: str) -> Optional[Tuple[s
     
     adv_search_url = 'https://www.tcichemicals.com/US/en/search/'
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
-        'Referer': adv_search_url,
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'same-origin',
-        'Sec-Fetch-User': '?1',
-    }
+    headers = TCI_HEADERS
 
-    if debug:
-        print(f'Searching TCI Chemicals for product name: {product_name}')
+    logger.debug('Searching TCI Chemicals for product name: %s', product_name)
 
     try:
-        with requests.Session() as s:
-            get_id = s.get(adv_search_url, headers=headers, timeout=10, params={'text': product_name})
+        with pooled_session() as s:
+            get_id = s.get(adv_search_url, headers=headers, timeout=SEARCH_TIMEOUT, params={'text': product_name})
 
             if get_id.status_code == 200 and len(get_id.history) == 0:
-                html = BeautifulSoup(get_id.text, 'html.parser')
+                body = get_id.content
+
+                # Without a result div there is no hit to read, so the page isn't parsed
+                if b'prductlist' not in body:
+                    return None
 
                 # Get the token, required for POST request for SDS file name later
-                csrf_token = html.find('input', attrs={'name': 'CSRFToken'})
+                csrf_token = read_tci_csrf_token(body)
                 if not csrf_token:
                     return None
-                csrf_token = csrf_token['value']
 
-                region_code = html.find_all(string=re.compile(r'(encodedContextPath[^;]+?;)'))
-                if not region_code:
+                # Set in an inline script, searched in the page source instead of every text node
+                encoded_context_path_match = ENCODED_CONTEXT_PATH_VALUE_PATTERN.search(body)
+                if not encoded_context_path_match:
                     return None
-                    
-                encodedContextPath = re.search(r'(encodedContextPath[^;]+?\'(\S+)\';)', region_code[0])[2].replace('\\', '')
+
+                encodedContextPath = encoded_context_path_match[2].decode().replace('\\', '')
+
+                html = BeautifulSoup(body, HTML_PARSER, parse_only=TCI_RESULTS_STRAINER)
 
                 product_cat_css = 'div#contentSearchFacet > span.facet__text:first-child > a:first-child'
                 product_category_elements = html.select(product_cat_css)
@@ -267,7 +381,7 @@ def extract_download_url_from_tci_by_name(product_name: str) -> Optional[Tuple[s
                 if product_category.text == 'Products':
                     hit_count_elements = html.select(f'{product_cat_css} + span.facet__value__count')
                     if hit_count_elements:
-                        hit_count_match = re.search(r'\((\d+)\)', hit_count_elements[0].text)
+                        hit_count_match = HIT_COUNT_PATTERN.search(hit_count_elements[0].text)
                         if hit_count_match:
                             hit_count = int(hit_count_match[1])
 
@@ -292,13 +406,14 @@ def extract_download_url_from_tci_by_name(product_name: str) -> Optional[Tuple[s
                         'CSRFToken': f'{csrf_token}'
                     }
                     
-                    file_name_res = s.post(sds_url, headers=headers, timeout=15, data=data)
-                    
-                    content_disposition = file_name_res.headers.get('content-disposition')
+                    # The response is the SDS itself, only the file name in its headers is used
+                    with s.post(sds_url, headers=headers, timeout=SEARCH_TIMEOUT, data=data,
+                                stream=True) as file_name_res:
+                        content_disposition = file_name_res.headers.get('content-disposition')
                     if not content_disposition:
                         return None
                         
-                    file_match = re.search(r'filename=(\S+)$', content_disposition)
+                    file_match = FILENAME_PATTERN.search(content_disposition)
                     if not file_match:
                         return None
                         
@@ -307,12 +422,13 @@ def extract_download_url_from_tci_by_name(product_name: str) -> Optional[Tuple[s
                     
                     return 'TCI', url
 
-    except Exception as error:
-        if debug:
-            traceback.print_exception(error)
+    except Exception:
+        logger.warning('Searching TCI Chemicals for product name %s failed', product_name,
+                       exc_info=logger.isEnabledFor(logging.DEBUG))
     
     return None
 
+@cache_by_name
 def extract_download_url_from_chemblink_by_name(product_name: str) -> Optional[Tuple[str, str]]:
     """Search for SDS by product name from ChemBlink
     
@@ -330,40 +446,35 @@ def extract_download_url_from_chemblink_by_name(product_name: str) -> Optional[T
         Tuple of (source_name, url) if found, None otherwise
     """
     
-    headers = {
-        'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36'
-    }
+    headers = DEFAULT_HEADERS
 
     # ChemBlink has a general search that might find product names
     # This is a best-effort implementation
     search_url = f'https://www.chemblink.com/search.htm'
     params = {'q': product_name}
 
-    if debug:
-        print(f'Searching ChemBlink for product name: {product_name}')
+    logger.debug('Searching ChemBlink for product name: %s', product_name)
 
     try:
-        r1 = requests.get(search_url, headers=headers, params=params, timeout=20)
+        r1 = SESSION.get(search_url, headers=headers, params=params, timeout=SEARCH_TIMEOUT)
         
         if r1.status_code == 200 and len(r1.history) == 0:
-            soup = BeautifulSoup(r1.text, 'html.parser')
-            
             # Look for CAS numbers in the search results
-            # ChemBlink search results usually show CAS numbers
-            cas_pattern = r'\b\d{2,7}-\d{2}-\d\b'
-            cas_matches = re.findall(cas_pattern, r1.text)
+            # ChemBlink search results usually show CAS numbers.
+            # Only the first one is used, so the raw page is searched without decoding it
+            cas_match = CAS_NUMBER_PATTERN.search(r1.content)
             
-            if cas_matches:
+            if cas_match:
                 # Try to get SDS for the first CAS number found
-                from find_sds.find_sds import extract_download_url_from_chemblink
-                return extract_download_url_from_chemblink(cas_matches[0])
+                return extract_download_url_from_chemblink(cas_match[0].decode('ascii'))
 
-    except Exception as error:
-        if debug:
-            traceback.print_exception(error)
+    except Exception:
+        logger.warning('Searching ChemBlink for product name %s failed', product_name,
+                       exc_info=logger.isEnabledFor(logging.DEBUG))
     
     return None
 
+@cache_by_name
 def extract_download_url_from_fluorochem_by_name(product_name: str) -> Optional[Tuple[str, str]]:
     """Search for SDS by product name from Fluorochem
     
@@ -378,10 +489,7 @@ def extract_download_url_from_fluorochem_by_name(product_name: str) -> Optional[
         Tuple of (source_name, url) if found, None otherwise
     """
     
-    headers = {
-        'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36',
-        'Content-Type': 'application/json',
-    }
+    headers = FLUOROCHEM_HEADERS
 
     url = 'https://dougdiscovery.com/api/v1/molecules/search'
     payload = {
@@ -390,34 +498,104 @@ def extract_download_url_from_fluorochem_by_name(product_name: str) -> Optional[
         "limit": 12
     }
 
-    if debug:
-        print(f'Searching Fluorochem for product name: {product_name}')
+    logger.debug('Searching Fluorochem for product name: %s', product_name)
 
     try:
-        r = requests.post(url, headers=headers, timeout=20, data=json.dumps(payload))
+        r = SESSION.post(url, headers=headers, timeout=SEARCH_TIMEOUT, data=orjson.dumps(payload))
         
         if r.status_code == 200 and len(r.history) == 0:
-            res = r.json()
+            res = orjson.loads(r.content)
             
-            if res.get('data') and len(res['data']) > 0:
-                # Look through results for matches
-                for item in res['data']:
-                    molecule = item.get('molecule', {})
-                    
-                    # Check if product name appears in molecule name or synonyms
-                    molecule_name = molecule.get('name', '').lower()
-                    search_name = product_name.lower()
-                    
-                    if search_name in molecule_name or molecule_name in search_name:
-                        sds_info = molecule.get('sds')
-                        if sds_info:
-                            sds_partial_url_en = sds_info.get('custrecord_sdslink_en')
-                            if sds_partial_url_en:
-                                full_url = f'https://7128445.app.netsuite.com{sds_partial_url_en}'
-                                return 'Fluorochem', full_url
-
-    except Exception as error:
-        if debug:
-            traceback.print_exception(error)
+            # Look through results for matches
+            search_name = product_name.casefold()
+            for item in res.get('data') or ():
+                molecule = item.get('molecule') or {}
+                
+                # Check if product name appears in molecule name or synonyms,
+                # molecules without a name would match every search
+                molecule_name = (molecule.get('name') or '').casefold()
+                if not molecule_name:
+                    continue
+                
+                if search_name in molecule_name or molecule_name in search_name:
+                    sds_info = molecule.get('sds') or {}
+                    sds_partial_url_en = sds_info.get('custrecord_sdslink_en')
+                    if sds_partial_url_en:
+                        full_url = f'https://7128445.app.netsuite.com{sds_partial_url_en}'
+                        return 'Fluorochem', full_url
+
+    except Exception:
+        logger.warning('Searching Fluorochem for product name %s failed', product_name,
+                       exc_info=logger.isEnabledFor(logging.DEBUG))
     
     return None
+
+# Product name searches in the order their results are preferred
+PRODUCT_NAME_EXTRACTORS = (
+    extract_download_url_from_chemicalsafety_by_name,
+    extract_download_url_from_vwr_by_name,
+    extract_download_url_from_fisher_by_name,
+    extract_download_url_from_tci_by_name,
+    extract_download_url_from_chemblink_by_name,
+    extract_download_url_from_fluorochem_by_name,
+)
+
+def search_all_vendors(product_name: str) -> Optional[Tuple[str, str]]:
+    """Search every vendor for an SDS by product name at the same time
+    
+    The searches only wait on the network, so they run in threads and the
+    search takes as long as the slowest vendor instead of all of them together
+    
+    Parameters
+    ----------
+    product_name : str
+        Product name to search for
+        
+    Returns
+    -------
+    Optional[Tuple[str, str]]
+        Tuple of (source_name, url) from the first vendor in
+        PRODUCT_NAME_EXTRACTORS that has the SDS, None otherwise
+    """
+    with ThreadPoolExecutor(max_workers=len(PRODUCT_NAME_EXTRACTORS)) as executor:
+        results = executor.map(lambda extractor: extractor(product_name), PRODUCT_NAME_EXTRACTORS)
+    
+    return next((result for result in results if result), None)
+
+
+def lookup_many(product_names: Iterable[str],
+                extractors: Optional[Sequence[Callable[[str], Optional[Tuple[str, str]]]]] = None,
+                max_workers: int = 16) -> Dict[str, Optional[Tuple[str, str]]]:
+    """Search the vendors for an SDS for several product names at the same time
+
+    Every (vendor, product name) search is run in one thread pool instead of
+    searching the names one after another
+    
+    Parameters
+    ----------
+    product_names : Iterable[str]
+        Product names to search for
+    extractors : Optional[Sequence[Callable]]
+        Vendor searches in order of preference, PRODUCT_NAME_EXTRACTORS by default
+    max_workers : int
+        Number of searches running at the same time
+        
+    Returns
+    -------
+    Dict[str, Optional[Tuple[str, str]]]
+        Each product name mapped to the (source_name, url) of the first
+        vendor in extractors that has the SDS, or None
+    """
+    extractors = extractors or PRODUCT_NAME_EXTRACTORS
+    product_names = list(dict.fromkeys(product_names))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            product_name: [executor.submit(extractor, product_name) for extractor in extractors]
+            for product_name in product_names
+        }
+    
+    return {
+        product_name: next((future.result() for future in name_futures if future.result()), None)
+        for product_name, name_futures in futures.items()
+    }
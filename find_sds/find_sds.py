@@ -11,18 +11,34 @@ using multithreading
 """
 
 
-import json
 import os
 import re
 import sys
+import threading
+import time
 import traceback
-from functools import partial
-from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from http.cookiejar import DefaultCookiePolicy
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urljoin
 
+import orjson
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+
+# Parse pages with lxml when it is installed, it is several times faster
+# than the parser built into Python
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
 
 debug = False
 # print out extra info in debug mode in case SDS is not found
@@ -30,6 +46,405 @@ if len(sys.argv) == 2 and sys.argv[1] in ['--debug=True', '--debug=true', '--deb
     debug = True
 
 
+# CAS numbers without an SDS are saved in this file in the download folder,
+# they aren't searched again by find_sds() until MISSING_SDS_CACHE_TTL has passed
+MISSING_SDS_CACHE_FILE = '.missing_sds.json'
+MISSING_SDS_CACHE_TTL = 7 * 24 * 3600  # seconds
+
+# SDS found for a CAS number are kept in memory for DOWNLOAD_URL_CACHE_TTL,
+# so downloading the SDS again in another folder doesn't search every website
+DOWNLOAD_URL_CACHE_TTL = 24 * 3600  # seconds
+DOWNLOAD_URL_CACHE = TTLCache(maxsize=4096, ttl=DOWNLOAD_URL_CACHE_TTL)
+DOWNLOAD_URL_CACHE_LOCK = threading.Lock()
+
+CAS_PATTERN = re.compile(r'^(\d{2,7})-(\d{2})-(\d)$')
+
+# Connection pool shared by all searches, so connections to the SDS websites
+# are kept open between searches instead of being set up again for each one.
+# Requests failing with a temporary server error are tried again after a
+# growing, randomized delay, so threads searching the same website don't all
+# retry at once. The response of the last try is returned as before;
+# connection errors fail straight away.
+# Up to 64 connections are kept per website so threaded searches don't open
+# connections that are then thrown away (urllib3 already sets TCP_NODELAY)
+HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, connect=0, read=0, backoff_factor=0.5, backoff_jitter=0.25,
+                      status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+)
+
+# Session for searches that don't depend on cookies. It never stores cookies,
+# so searches running at the same time can't affect each other through it
+SESSION = requests.Session()
+SESSION.mount('https://', HTTP_ADAPTER)
+SESSION.mount('http://', HTTP_ADAPTER)
+SESSION.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+# Ask for every compression urllib3 can decode, brotli and zstd are only
+# included when the brotli and zstandard packages are installed
+SESSION.headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+
+def is_pdf_url(url: str) -> bool:
+    """Check that url is an http(s) link to a PDF file
+
+    Plain string checks instead of a regular expression, it is called for
+    every row of the ChemicalSafety search results
+
+    Parameters
+    ----------
+    url : str
+        URL to check
+
+    Returns
+    -------
+    bool
+        True if url starts with 'http' and ends with '.pdf', False otherwise
+    """
+    return len(url) > 8 and url.startswith('http') and url.endswith('.pdf')
+
+
+@contextmanager
+def pooled_session() -> Iterator[requests.Session]:
+    """Session with its own cookies that uses the shared connection pool
+
+    Use it instead of `with requests.Session() as s:` for searches that need
+    cookies across several requests
+
+    Yields
+    ------
+    requests.Session
+        new session using HTTP_ADAPTER
+    """
+    session = requests.Session()
+    session.mount('https://', HTTP_ADAPTER)
+    session.mount('http://', HTTP_ADAPTER)
+    # Not closed afterwards, that would close the connections of HTTP_ADAPTER
+    yield session
+
+
+# Seconds to wait for a connection to a website, and for its response to
+# continue, so a website that is down or hangs is given up on quickly
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 10
+SEARCH_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Request headers of the searches, built once instead of on every search
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36'
+DEFAULT_HEADERS = {'user-agent': USER_AGENT}
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+FISHER_HEADERS = {
+    'user-agent': USER_AGENT,
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'same-origin',
+    'Sec-Fetch-User': '?1',
+}
+CHEMICALSAFETY_HEADERS = {
+    'user-agent': USER_AGENT,
+    'accept-encoding': ACCEPT_ENCODING,
+    'content-type': 'application/json',
+    # 'Referer': 'https://chemicalsafety.com/sds-search/',
+}
+# The ChemicalSafety CAS search form serialized once, split around the
+# criterion of the search
+CHEMICALSAFETY_FORM_START, CHEMICALSAFETY_FORM_END = orjson.dumps({
+    "IsContains":"false",
+    "IncludeSynonyms":"false",
+    "SearchSdsServer":"false",
+    "Criteria":["CRITERION"],
+    "HostName":"sfs website",
+    # "Remote":"97.64.216.42",
+    "Bee":"stevia","Action":"search","SearchUrl":"","ResultColumns":["revision_date"]
+}).split(b'"CRITERION"')
+TCI_SEARCH_URL = 'https://www.tcichemicals.com/US/en/search/'
+TCI_ALT_SEARCH_URL = 'https://www.tcichemicals.com/US/en/search'
+TCI_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
+    'Referer': TCI_SEARCH_URL,
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'same-origin',
+    'Sec-Fetch-User': '?1',
+}
+
+# Patterns used while scraping, compiled once instead of on every search
+SDS_LINK_TEXT_PATTERN = re.compile(r'View / download')
+SDS_SOURCE_PATTERN = re.compile(r'([a-zA-Z\-]+)\.pdf')
+# Searched in the raw bytes of the TCI search page
+ENCODED_CONTEXT_PATH_VALUE_PATTERN = re.compile(rb'(encodedContextPath[^;]+?\'(\S+)\';)')
+HIT_COUNT_PATTERN = re.compile(r'\((\d+)\)')
+FILENAME_PATTERN = re.compile(r'filename=(\S+)$')
+TCI_CSRF_TOKEN_PATTERN = re.compile(rb'name="CSRFToken"[^>]*value="([^"]+)"')
+# Link address and text of what looks like an SDS link on the VWR and Fluorochem pages
+SDS_HREF_PATTERN = re.compile(r'sds|safety', re.IGNORECASE)
+SDS_TEXT_PATTERN = re.compile(r'sds|safety data sheet', re.IGNORECASE)
+# First capitalized word of more than 3 characters, taken as the manufacturer of a VWR SDS
+MANUFACTURER_WORD_PATTERN = re.compile(r'(?<!\S)[A-Z]\S{3,}')
+
+# Candidate SDS links on the VWR and Fluorochem pages in order of preference,
+# each check is given the href and text of a link
+SDS_LINK_CHECKS = (
+    lambda href, text: 'sds' in href,                 # a[href*="sds"], a[href*="msds"]
+    lambda href, text: 'SDS' in href,                 # a[href*="SDS"], a[href*="MSDS"]
+    lambda href, text: 'SDS' in text,                 # a:contains("SDS"), a:contains("MSDS")
+    lambda href, text: 'Safety Data Sheet' in text,   # a:contains("Safety Data Sheet")
+    lambda href, text: href.endswith('.pdf'),         # a[href$=".pdf"]
+)
+
+
+def load_missing_sds_cache(download_path: str) -> Dict[str, float]:
+    """Read the CAS numbers recently searched without finding an SDS
+
+    Parameters
+    ----------
+    download_path : str
+        the download folder holding MISSING_SDS_CACHE_FILE
+
+    Returns
+    -------
+    Dict[str, float]
+        CAS number mapped to the time it was last searched, for the searches
+        not older than MISSING_SDS_CACHE_TTL. Empty if the file can't be read
+    """
+    try:
+        cache = orjson.loads((Path(download_path) / MISSING_SDS_CACHE_FILE).read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+    if not isinstance(cache, dict):
+        return {}
+
+    now = time.time()
+    return {
+        cas_nr: searched for cas_nr, searched in cache.items()
+        if isinstance(searched, (int, float)) and now - searched < MISSING_SDS_CACHE_TTL
+    }
+
+
+def save_missing_sds_cache(download_path: str, cache: Dict[str, float]) -> None:
+    """Write the CAS numbers searched without finding an SDS
+
+    Parameters
+    ----------
+    download_path : str
+        the download folder to write MISSING_SDS_CACHE_FILE to
+    cache : Dict[str, float]
+        CAS number mapped to the time it was last searched
+    """
+    cache_file = Path(download_path) / MISSING_SDS_CACHE_FILE
+    tmp_file = cache_file.with_suffix('.tmp')
+    tmp_file.write_bytes(orjson.dumps(cache))
+    # Replace atomically so a run reading the file never sees it half written
+    os.replace(tmp_file, cache_file)
+
+
+def _is_tci_result_tag(name: str, attrs: dict) -> bool:
+    """Whether a tag of a TCI search page holds the hit count or a search result"""
+    if name != 'div':
+        return False
+    classes = attrs.get('class') or ''
+    if isinstance(classes, str):
+        classes = classes.split()
+    return attrs.get('id') == 'contentSearchFacet' or 'prductlist' in classes
+
+
+# Only the parts of the TCI search page that are read are turned into a tree,
+# building the tree is most of the time spent parsing a page
+TCI_RESULTS_STRAINER = SoupStrainer(_is_tci_result_tag)
+
+
+def read_tci_csrf_token(body: bytes) -> Optional[str]:
+    """Read the CSRF token of a TCI search page
+
+    The token is matched in the raw page, the input is only parsed if its
+    attributes are in a different order
+
+    Parameters
+    ----------
+    body : bytes
+        the search page
+
+    Returns
+    -------
+    Optional[str]
+        the token, None if the page has none
+    """
+    csrf_token_match = TCI_CSRF_TOKEN_PATTERN.search(body)
+    if csrf_token_match:
+        return csrf_token_match[1].decode()
+
+    csrf_input = BeautifulSoup(body, HTML_PARSER, parse_only=SoupStrainer('input', attrs={'name': 'CSRFToken'})).find('input')
+    return csrf_input.get('value') if csrf_input else None
+
+
+def find_sds_links(html: BeautifulSoup) -> Iterator:
+    """Links of a page that may lead to an SDS, in the order of SDS_LINK_CHECKS
+
+    The links are collected in one pass over the page, instead of running a
+    CSS selector over the whole page for every check
+
+    Parameters
+    ----------
+    html : BeautifulSoup
+        the parsed page
+
+    Yields
+    ------
+    bs4.element.Tag
+        the <a> tags passing a check, a link passing several checks is
+        yielded for each of them
+    """
+    links = [(link, link.get('href') or '', link.get_text()) for link in html.find_all('a')]
+    for check in SDS_LINK_CHECKS:
+        for link, href, text in links:
+            if check(href, text):
+                yield link
+
+
+def first_result_in_order(extractors: Tuple[Callable[[str], Optional[Tuple[str, str]]], ...],
+                          cas_nr: str) -> Optional[Tuple[str, str]]:
+    """Run every extractor in its own thread and return the first result in order
+
+    Same result as `extractors[0](cas_nr) or extractors[1](cas_nr) or ...`,
+    but it takes as long as the slowest extractor that had to be waited for
+    instead of all of them together. It returns as soon as the result is
+    known, the extractors still running are left to finish in the background
+
+    Parameters
+    ----------
+    extractors : Tuple[Callable, ...]
+        the extractors in order of preference
+    cas_nr : str
+        CAS number to search for
+
+    Returns
+    -------
+    Optional[Tuple[str, str]]
+        the first result that isn't None, None if no extractor found an SDS
+    """
+    executor = ThreadPoolExecutor(max_workers=len(extractors))
+    try:
+        futures = [executor.submit(extractor, cas_nr) for extractor in extractors]
+        for future in futures:
+            result = future.result()
+            if result:
+                return result
+        return None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def is_failed_response(response: requests.Response) -> bool:
+    """Whether a website answered with an error instead of a search result
+
+    Rate limits (429) and server errors that are still there after the retries
+    come back as responses. A 404 is the website saying it has no such page,
+    so it counts as an answer
+
+    Parameters
+    ----------
+    response : requests.Response
+        the response of a search
+
+    Returns
+    -------
+    bool
+        True if the search couldn't be done, False if the website answered
+    """
+    return response.status_code not in (200, 404)
+
+
+def find_download_url(cas_nr: str) -> Tuple[Optional[Tuple[str, str]], bool]:
+    """Search every source for the SDS of a CAS number, or reuse a recent result
+
+    Only found SDS are kept in DOWNLOAD_URL_CACHE: a search also finds nothing
+    when a website fails, and CAS numbers without an SDS are remembered
+    per download folder by the missing SDS cache instead
+
+    Parameters
+    ----------
+    cas_nr : str
+        CAS number to search for
+
+    Returns
+    -------
+    Tuple[Optional[Tuple[str, str]], bool]
+        (sds_source, url) of the first source that has the SDS or None, and
+        True if the SDS wasn't found and a website couldn't be searched
+    """
+    with DOWNLOAD_URL_CACHE_LOCK:
+        result = DOWNLOAD_URL_CACHE.get(cas_nr)
+    if result is not None:
+        return result, False
+
+    # The failures of this search only, other searches of the same CAS
+    # number running at the same time keep their own
+    failed_searches = []
+
+    def search_and_note_failure(search: Callable[[str], Tuple[Optional[Tuple[str, str]], bool]]):
+        def search_cas(cas_nr: str) -> Optional[Tuple[str, str]]:
+            result, failed = search(cas_nr)
+            if failed:
+                failed_searches.append(search)
+            return result
+        return search_cas
+
+    # All sources are searched at the same time, the first one in
+    # this order that has the SDS is used
+    result = first_result_in_order(
+        tuple(search_and_note_failure(search) for search in (
+            search_chemblink,
+            search_vwr,
+            search_fisher,
+            search_tci,
+            search_chemicalsafety,
+            search_fluorochem,
+        )),
+        cas_nr
+    )
+    if result:
+        with DOWNLOAD_URL_CACHE_LOCK:
+            DOWNLOAD_URL_CACHE[cas_nr] = result
+        return result, False
+
+    # Without a result every search has finished, so all failures are known
+    return None, bool(failed_searches)
+
+
+def is_valid_cas(cas_nr: str) -> bool:
+    """Check that cas_nr is a well-formed CAS number with a correct check digit
+
+    The check digit is the sum of the other digits, each multiplied by its
+    position counted from the right, modulo 10
+
+    Parameters
+    ----------
+    cas_nr : str
+        CAS# to check, e.g. '67-63-0'
+
+    Returns
+    -------
+    bool
+        True if cas_nr is a valid CAS number, False otherwise
+    """
+    match = CAS_PATTERN.match(cas_nr)
+    if not match:
+        return False
+
+    digits = (match.group(1) + match.group(2))[::-1]
+    checksum = sum(int(digit) * position for position, digit in enumerate(digits, start=1)) % 10
+    return checksum == int(match.group(3))
+
+
 def find_sds(cas_list: List[str], download_path: str = None, pool_size: int = 10) -> None:
     """Find safety data sheet (SDS) for list of CAS numbers
 
@@ -42,8 +457,9 @@ def find_sds(cas_list: List[str], download_path: str = None, pool_size: int = 10
         by default None. If so, SDS will be downloaded into folder 'SDS'
             inside folder containing the python file
     pool_size : int, optional
-        the number of multithread that are running simultaneously,
-        by default 10
+        the number of threads searching at the same time, by default 10.
+        Threads are used, so no `if __name__ == '__main__':` guard is
+        needed in the calling script
 
     Returns
     -------
@@ -56,10 +472,20 @@ def find_sds(cas_list: List[str], download_path: str = None, pool_size: int = 10
 
     # global debug
 
-    # If the list of CAS is empty, exit the program
+    # If the list of CAS is empty there is nothing to do. Returning instead of
+    # exiting, so a program importing find_sds keeps running
     if not cas_list:
         print('List of CAS numbers is empty!')
-        exit(0)
+        return
+
+    # Each CAS number is searched once, and entries that aren't text, are
+    # malformed or have a wrong check digit are reported instead of being searched for
+    cas_list = list(dict.fromkeys(cas_nr.strip() if isinstance(cas_nr, str) else cas_nr
+                                  for cas_nr in cas_list))
+    invalid_cas = [cas_nr for cas_nr in cas_list if not isinstance(cas_nr, str) or not is_valid_cas(cas_nr)]
+    if invalid_cas:
+        print('Skipping invalid CAS numbers: {}'.format(invalid_cas))
+        cas_list = [cas_nr for cas_nr in cas_list if cas_nr not in invalid_cas]
 
     # # print out extra info in debug mode in case SDS is not found
     # if len(sys.argv) == 2 and sys.argv[1] in ['--debug=True', '--debug=true', '--debug', '-d']:
@@ -70,37 +496,53 @@ def find_sds(cas_list: List[str], download_path: str = None, pool_size: int = 10
     if not download_path:
         download_path = Path(__file__).resolve().parent / 'SDS'
 
-    # Get the set of CAS for molecule missing sds:
-    to_be_downloaded = set(cas_list)
-
     # Step 1: downloading sds file
     # Check if download path directory exists. If not, create it
     # https://stackoverflow.com/questions/12517451/automatically-creating-directories-with-file-output
     # https://docs.python.org/3/library/os.html#os.makedirs
     os.makedirs(download_path, exist_ok=True)
 
+    # The SDS already downloaded, listing the folder once instead of checking
+    # the file of each CAS number
+    file_suffix = '-SDS.pdf'
+    already_downloaded = {
+        entry.name[:-len(file_suffix)] for entry in os.scandir(download_path)
+        if entry.name.endswith(file_suffix)
+    }.intersection(cas_list)
+
+    # Get the set of CAS for molecule missing sds, skipping the ones recently
+    # searched without result unless their SDS has been added since
+    missing_sds_cache = load_missing_sds_cache(download_path)
+    recently_missing = set(cas_list).intersection(missing_sds_cache) - already_downloaded
+    to_be_downloaded = set(cas_list) - already_downloaded - recently_missing
+
     print('Downloading missing SDS files. Please wait!')
 
     download_result = []
     try:
-        # # Using multiprocessing (need to protect on Windows)
+        # The searches only wait on the websites, so they run in threads sharing
+        # the connection pool instead of in worker processes. This also works
+        # when find_sds is imported, e.g. by the API
         if not debug:
-            # On Windows, multiprocessing requires the main module to be protected
-            if __name__ == '__main__':
-                with Pool(pool_size) as p:
-                    download_result = p.map(partial(
-                                            download_sds,
-                                            download_path=download_path),
-                                        to_be_downloaded)
-            else:
-                # Fall back to sequential processing if not in main
-                download_result = []
-                for cas_nr in to_be_downloaded:
-                    download_result.append(download_sds(cas_nr=cas_nr, download_path=download_path))
+            executor = ThreadPoolExecutor(max_workers=pool_size)
+            try:
+                futures = [executor.submit(download_sds_with_status, cas_nr, download_path)
+                           for cas_nr in to_be_downloaded]
+                # Collected as they finish, so the progress is shown and the
+                # results so far are kept if the run is interrupted
+                for done, future in enumerate(as_completed(futures), start=1):
+                    result = future.result()
+                    download_result.append(result)
+                    if result:
+                        print('[{}/{}] {}: {}'.format(done, len(futures), result[0],
+                                                      'downloaded' if result[1] else 'not found'))
+            finally:
+                # Searches not started yet are dropped on error or Ctrl+C
+                executor.shutdown(wait=True, cancel_futures=True)
         else:
             download_result = []
             for cas_nr in to_be_downloaded:
-                download_result.append(download_sds(cas_nr=cas_nr, download_path=download_path))
+                download_result.append(download_sds_with_status(cas_nr=cas_nr, download_path=download_path))
     except Exception as error:
         # if debug:
         traceback.print_exc()
@@ -108,24 +550,40 @@ def find_sds(cas_list: List[str], download_path: str = None, pool_size: int = 10
 
     # Step 2: print out summary
     finally:
-        # Sometimes Pool worker return 'None', remove 'None' as the following
+        # Remove any 'None' result as the following
         # print(download_result)
         download_result = [x for x in download_result if x]
 
-        missing_sds = set()
-        updated_sds = set()
+        missing_sds = set(recently_missing)
+        updated_sds = set(already_downloaded)
+        for cas_nr in already_downloaded:
+            missing_sds_cache.pop(cas_nr, None)
 
-        for cas_nr, sds_existed, sds_source in download_result:
+        searched = time.time()
+        for cas_nr, sds_existed, sds_source, not_found in download_result:
             if sds_existed:
                 updated_sds.add(cas_nr)
+                missing_sds_cache.pop(cas_nr, None)
             else:
                 missing_sds.add(cas_nr)
+                # Only remembered when no website had the SDS, a website that
+                # couldn't be reached or a failed download is tried again next time
+                if not_found:
+                    missing_sds_cache[cas_nr] = searched
+
+        try:
+            save_missing_sds_cache(download_path, missing_sds_cache)
+        except OSError:
+            traceback.print_exc()
 
         if missing_sds:
             print('\nStill missing SDS:\n{}'.format(missing_sds))
 
         print('\nSummary: ')
         print('\t{} SDS files are missing.'.format(len(missing_sds)))
+        if recently_missing:
+            print('\t\t{} of them not searched again, no SDS was found in the last {} days.'.format(
+                len(recently_missing), MISSING_SDS_CACHE_TTL // (24 * 3600)))
         print('\t{} SDS files downloaded.'.format(len(updated_sds)))
 
         # Advice user about turning on debug mode for more error printing
@@ -156,6 +614,29 @@ def download_sds(cas_nr: str, download_path: str) -> Tuple[str, bool, Optional[s
         - bool: True if SDS file downloaded or exists
         - Optional[str]: the name of the SDS source or None
     """
+    return download_sds_with_status(cas_nr, download_path)[:3]
+
+
+def download_sds_with_status(cas_nr: str, download_path: str) -> Tuple[str, bool, Optional[str], bool]:
+    """Download SDS from variety of sources, telling a missing SDS apart from a failure
+
+    Parameters
+    ----------
+    cas_nr : str
+        The CAS number of the molecule of interest
+    download_path : str
+        The path to download folder
+
+    Returns
+    -------
+    Tuple[str, bool, Optional[str]]
+        - str: CAS number of the input chemical
+        - bool: True if SDS file downloaded or exists
+        - Optional[str]: the name of the SDS source or None
+        - bool: True if every website was searched and none had the SDS,
+          False if it was found, a website couldn't be reached or the
+          download failed
+    """
 
     # global debug
     '''This function is used to extract a single sds file
@@ -172,48 +653,59 @@ def download_sds(cas_nr: str, download_path: str) -> Tuple[str, bool, Optional[s
         # print('{} already downloaded'.format(file_name))
         # print('.', end='')
         downloaded = True
-        return cas_nr, downloaded, None
+        return cas_nr, downloaded, None, False
 
     else:
-        print('\nSearching for {} ...'.format(file_name))
-        headers = {
-            'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36'}
+        # find_sds prints a progress line per finished CAS number from the main
+        # thread, so the threads searching don't all write to stdout
+        if debug:
+            print('\nSearching for {} ...'.format(file_name))
+        headers = DEFAULT_HEADERS
 
         try:
             # print('CAS {} ...'.format(file_name))
-            sds_source, full_url = (
-                extract_download_url_from_chemblink(cas_nr) or \
-                extract_download_url_from_vwr(cas_nr) or \
-                extract_download_url_from_fisher(cas_nr) or \
-                extract_download_url_from_tci(cas_nr) or \
-                extract_download_url_from_chemicalsafety(cas_nr) or \
-                extract_download_url_from_fluorochem(cas_nr) or \
-                (None, None)
-            )
+            found, search_failed = find_download_url(cas_nr)
+            sds_source, full_url = found or (None, None)
             # sds_source, full_url = extract_download_url_from_tci(cas_nr)
 
             # print('full url is: {}'.format(full_url))
             if full_url:    # extract with chemicalsafety
-                r = requests.get(full_url, headers=headers, timeout=20)
-                # Check to see if give OK status (200) and not redirect
-                if r.status_code == 200 and len(r.history) == 0:
-                    # print('\nDownloading {} ...'.format(file_name))
-                    open(download_file, 'wb').write(r.content)
-                    # print()
-                    # return (0, sds_source)
-                    downloaded = True
-                    return (cas_nr, downloaded, sds_source)
+                with SESSION.get(full_url, headers=headers, timeout=(CONNECT_TIMEOUT, 20), stream=True) as r:
+                    # Check to see if give OK status (200) and not redirect
+                    if r.status_code == 200 and len(r.history) == 0:
+                        # print('\nDownloading {} ...'.format(file_name))
+                        # Written in chunks as it is received instead of holding the whole
+                        # PDF in memory. Downloaded to a temporary file first, so a failed
+                        # download doesn't leave a file that counts as already downloaded
+                        part_file = download_file.with_name(file_name + '.part')
+                        try:
+                            with open(part_file, 'wb') as f:
+                                for chunk in r.iter_content(chunk_size=64 * 1024):
+                                    f.write(chunk)
+                            os.replace(part_file, download_file)
+                        finally:
+                            if part_file.exists():
+                                part_file.unlink()
+                        # print()
+                        # return (0, sds_source)
+                        downloaded = True
+                        return (cas_nr, downloaded, sds_source, False)
+
+                # The link has gone stale, the next download searches again
+                with DOWNLOAD_URL_CACHE_LOCK:
+                    DOWNLOAD_URL_CACHE.pop(cas_nr, None)
+                return (cas_nr, downloaded, None, False)
 
             else:
                 # return download_sds_tci(cas_nr, download_path)    # May 5, 2020: TCI has updated to newer website, scraping currently not working
-                return (cas_nr, downloaded, None)
+                return (cas_nr, downloaded, None, not search_failed)
 
         except Exception as error:
             if debug:
                 # traceback_str = ''.join(traceback.format_exception(etype=type(error), value=error, tb=error.__traceback__))
                 # print(traceback_str)
                 traceback.print_exception(error)
-            return (cas_nr, downloaded, None)
+            return (cas_nr, downloaded, None, False)
 
 
 def extract_download_url_from_chemblink(cas_nr: str) -> Optional[Tuple[str, str]]:
@@ -238,12 +730,27 @@ def extract_download_url_from_chemblink(cas_nr: str) -> Optional[Tuple[str, str]
     >>> print(extract_download_url_from_chemblink(cas_nr='681128-50-7'))
     ('Matrix', 'https://www.chemblink.com/MSDS/MSDSFiles/681128-50-7_Matrix.pdf')
     """
+    return search_chemblink(cas_nr)[0]
+
+
+def search_chemblink(cas_nr: str) -> Tuple[Optional[Tuple[str, str]], bool]:
+    """Search ChemBlink for the SDS of cas_nr, see extract_download_url_from_chemblink
+
+    Parameters
+    ----------
+    cas_nr : str
+        CAS# for chemical of interest
+
+    Returns
+    -------
+    Tuple[Optional[Tuple[str, str]], bool]
+        the (source, url) of the SDS or None, and True if ChemBlink couldn't
+        be searched, e.g. it wasn't reachable or answered with a 429 or 5xx
+    """
 
     # global debug
 
-    headers = {
-        'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36'
-    }
+    headers = DEFAULT_HEADERS
 
     # get url from chemicalsafety.com to get url to download sds file
     extract_info_url = f'https://www.chemblink.com/MSDS/{cas_nr}MSDS.htm'
@@ -252,25 +759,28 @@ def extract_download_url_from_chemblink(cas_nr: str) -> Optional[Tuple[str, str]
         print('Searching on https://www.chemblink.com')
 
     try:
-        r1 = requests.get(extract_info_url, headers=headers, timeout=20)
+        r1 = SESSION.get(extract_info_url, headers=headers, timeout=SEARCH_TIMEOUT)
         # print(r1)
+        if is_failed_response(r1):
+            return None, True
 
         # Check to see if give OK status (200) and not redirect
         if r1.status_code == 200 and len(r1.history) == 0:
-            soup = BeautifulSoup(r1.text, 'html.parser')
+            # Only the links are read, so only they are turned into a tree
+            soup = BeautifulSoup(r1.content, HTML_PARSER, parse_only=SoupStrainer('a'))
             if soup:
                 # Find all <a> tags with content "View / download", example: https://www.chemblink.com/MSDS/64-19-7_MSDS.htm
                 # Example of a correct <a> tag for SDS download: '<a href="/MSDS/MSDSFiles/64-19-7_Alfa-Aesar.pdf" class="blue" onclick="blur()" target="_blank">View / download</a>'
-                a_tags = soup.find_all('a', string=re.compile(r'View / download'))
+                a_tags = soup.find_all('a', string=SDS_LINK_TEXT_PATTERN)
                 if a_tags:
                     domain = 'https://www.chemblink.com'
                     sds_link = a_tags[0]['href']
                     # # Get source name from sds_link, example of sds_link href: '/MSDS/MSDSFiles/64-19-7_Alfa-Aesar.pdf' (before Jul 21 2024)
                     # source = re.search(r'\S+_(\S*)\.pdf', sds_link).group(1)
                     # Get source name from sds_link, example of sds_link href: '/MSDS/MSDSFiles/64-19-7Alfa-Aesar.pdf'
-                    source = re.search(r'([a-zA-Z\-]+)\.pdf', sds_link).group(1)
+                    source = SDS_SOURCE_PATTERN.search(sds_link).group(1)
                     full_url = f'{domain}{sds_link}'
-                    return source, full_url
+                    return (source, full_url), False
 
     except Exception as error:
         # print('.', end='')
@@ -278,7 +788,10 @@ def extract_download_url_from_chemblink(cas_nr: str) -> Optional[Tuple[str, str]
             # traceback_str = ''.join(traceback.format_exception(etype=type(error), value=error, tb=error.__traceback__))
             # print(traceback_str)
             traceback.print_exception(error)
-        # return None
+        # A network error means the website couldn't be searched
+        return None, isinstance(error, requests.RequestException)
+
+    return None, False
 
 
 def extract_download_url_from_vwr(cas_nr: str) -> Optional[Tuple[str, str]]:
@@ -298,17 +811,26 @@ def extract_download_url_from_vwr(cas_nr: str) -> Optional[Tuple[str, str]]:
             the URL from Avantor for SDS file
         None: if URL cannot be found
     """
+    return search_vwr(cas_nr)[0]
+
+
+def search_vwr(cas_nr: str) -> Tuple[Optional[Tuple[str, str]], bool]:
+    """Search Avantor (formerly VWR) for the SDS of cas_nr, see extract_download_url_from_vwr
+
+    Parameters
+    ----------
+    cas_nr : str
+        CAS# for chemical of interest
+
+    Returns
+    -------
+    Tuple[Optional[Tuple[str, str]], bool]
+        the (source, url) of the SDS or None, and True if Avantor (formerly VWR) couldn't
+        be searched, e.g. it wasn't reachable or answered with a 429 or 5xx
+    """
     global debug
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Accept-Encoding': 'gzip, deflate',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1'
-    }
+    headers = BROWSER_HEADERS
 
     if debug:
         print('Searching on Avantor Sciences (formerly VWR)')
@@ -324,74 +846,66 @@ def extract_download_url_from_vwr(cas_nr: str) -> Optional[Tuple[str, str]]:
     ]
 
     try:
-        with requests.Session() as session:
+        with pooled_session() as session:
+            failed_urls = 0
             for search_url in search_urls:
                 try:
-                    response = session.get(search_url, headers=headers, timeout=20, allow_redirects=True)
+                    response = session.get(search_url, headers=headers, timeout=SEARCH_TIMEOUT, allow_redirects=True)
+                    if is_failed_response(response):
+                        failed_urls += 1
+                        continue
                     
                     if response.status_code == 200:
-                        html = BeautifulSoup(response.text, 'html.parser')
-                        
-                        # Look for various SDS link patterns
-                        sds_patterns = [
-                            # Direct SDS/MSDS links
-                            'a[href*="sds"]',
-                            'a[href*="msds"]', 
-                            'a[href*="SDS"]',
-                            'a[href*="MSDS"]',
-                            # Links with SDS text
-                            'a:contains("SDS")',
-                            'a:contains("MSDS")',
-                            'a:contains("Safety Data Sheet")',
-                            # PDF links (many SDS are PDFs)
-                            'a[href$=".pdf"]'
-                        ]
+                        html = BeautifulSoup(response.content, HTML_PARSER)
                         
-                        for pattern in sds_patterns:
-                            sds_links = html.select(pattern)
-                            
-                            for link in sds_links:
-                                href = link.get('href', '')
-                                if href and any(term in href.lower() for term in ['sds', 'msds', 'safety']):
-                                    # Make URL absolute if needed
-                                    if not href.startswith('http'):
-                                        from urllib.parse import urljoin
-                                        href = urljoin(response.url, href)
-                                    
-                                    # Try to determine source/manufacturer
-                                    source = 'Avantor'
-                                    
-                                    # Look for manufacturer info near the link
-                                    parent = link.parent
-                                    if parent:
-                                        parent_text = parent.get_text(strip=True)
-                                        # Extract potential manufacturer name
-                                        for word in parent_text.split():
-                                            if len(word) > 3 and word[0].isupper():
-                                                source = word
-                                                break
-                                    
-                                    return source, href
+                        # Look for SDS/MSDS links, links with SDS text and PDF links
+                        # (many SDS are PDFs)
+                        for link in find_sds_links(html):
+                            href = link.get('href', '')
+                            if href and SDS_HREF_PATTERN.search(href):
+                                # Make URL absolute if needed
+                                if not href.startswith('http'):
+                                    href = urljoin(response.url, href)
+                                
+                                # Try to determine source/manufacturer
+                                source = 'Avantor'
+                                
+                                # Look for manufacturer info near the link
+                                parent = link.parent
+                                if parent:
+                                    parent_text = parent.get_text(strip=True)
+                                    # Extract potential manufacturer name
+                                    manufacturer_match = MANUFACTURER_WORD_PATTERN.search(parent_text)
+                                    if manufacturer_match:
+                                        source = manufacturer_match[0]
+                                
+                                return (source, href), False
                         
                         # If no SDS links found, check if this is a search results page
-                        # and look for product links to follow
-                        product_links = html.select('a[href*="product"]')
-                        if product_links and len(product_links) > 0:
-                            # Could potentially follow product links to find SDS
-                            # For now, just indicate that search worked but no direct SDS found
-                            if debug:
+                        # and look for product links to follow. Only reported in debug
+                        # mode, so the page isn't searched again otherwise
+                        if debug:
+                            product_links = html.select('a[href*="product"]')
+                            if product_links:
+                                # Could potentially follow product links to find SDS
+                                # For now, just indicate that search worked but no direct SDS found
                                 print(f"  Found {len(product_links)} product links but no direct SDS")
                                 
                 except requests.RequestException as e:
+                    failed_urls += 1
                     if debug:
                         print(f"  Error with {search_url}: {e}")
                     continue
+
+            # Only failed if not one search page could be read
+            return None, failed_urls == len(search_urls)
                     
     except Exception as error:
         if debug:
             print(f"VWR/Avantor search failed: {error}")
+        return None, isinstance(error, requests.RequestException)
 
-    return None
+    return None, False
 
 
 def extract_download_url_from_fisher(cas_nr: str) -> Optional[Tuple[str, str]]:
@@ -411,16 +925,27 @@ def extract_download_url_from_fisher(cas_nr: str) -> Optional[Tuple[str, str]]:
             the URL from Fisher for SDS file
         None: if URL cannot be found
     """
+    return search_fisher(cas_nr)[0]
+
+
+def search_fisher(cas_nr: str) -> Tuple[Optional[Tuple[str, str]], bool]:
+    """Search Fisher Scientific for the SDS of cas_nr, see extract_download_url_from_fisher
+
+    Parameters
+    ----------
+    cas_nr : str
+        CAS# for chemical of interest
+
+    Returns
+    -------
+    Tuple[Optional[Tuple[str, str]], bool]
+        the (source, url) of the SDS or None, and True if Fisher Scientific couldn't
+        be searched, e.g. it wasn't reachable or answered with a 429 or 5xx
+    """
 
     # global debug
 
-    headers = {
-        'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'same-origin',
-        'Sec-Fetch-User': '?1',
-    }
+    headers = FISHER_HEADERS
 
     # get url from Fisher to get url to download sds file
     extract_info_url = 'https://www.fishersci.com/us/en/catalog/search/sds'
@@ -433,12 +958,14 @@ def extract_download_url_from_fisher(cas_nr: str) -> Optional[Tuple[str, str]]:
         print('Searching on https://www.fishersci.com/us/en/catalog/search/sdshome.html')
 
     try:
-        r = requests.get(extract_info_url, headers=headers, timeout=10, params=payload)
+        r = SESSION.get(extract_info_url, headers=headers, timeout=SEARCH_TIMEOUT, params=payload)
+        if is_failed_response(r):
+            return None, True
         # Check to see if give OK status (200) and not redirect
         if r.status_code == 200 and len(r.history) == 0:
             # BeautifulSoup ref: https://www.digitalocean.com/community/tutorials/how-to-scrape-web-pages-with-beautiful-soup-and-python-3
             # Using BeautifulSoup to scrap text
-            html = BeautifulSoup(r.text, 'html.parser')
+            html = BeautifulSoup(r.content, HTML_PARSER)
             # The list of found sds is in class 'catalog_num', with each item in class 'catlog_items'
             # cat_no_list = html.find(class_='catalog_num')    # This is to find all of the sds
 
@@ -460,7 +987,7 @@ def extract_download_url_from_fisher(cas_nr: str) -> Optional[Tuple[str, str]]:
                 catalogID = cat_no_items[0].contents[0]
                 full_url = 'https://www.fishersci.com' + rel_download_url
                 # print(f'rel_download_url is {rel_download_url}')
-                return 'Fisher', full_url
+                return ('Fisher', full_url), False
 
     except Exception as error:
         # print('.', end='')
@@ -468,7 +995,10 @@ def extract_download_url_from_fisher(cas_nr: str) -> Optional[Tuple[str, str]]:
             # traceback_str = ''.join(traceback.format_exception(etype=type(error), value=error, tb=error.__traceback__))
             # print(traceback_str)
             traceback.print_exception(error)
-        # return None
+        # A network error means the website couldn't be searched
+        return None, isinstance(error, requests.RequestException)
+
+    return None, False
 
 
 def extract_download_url_from_chemicalsafety(cas_nr: str) -> Optional[Tuple[str, str]]:
@@ -488,15 +1018,27 @@ def extract_download_url_from_chemicalsafety(cas_nr: str) -> Optional[Tuple[str,
             the URL from Fisher for SDS file
         None: if URL cannot be found
     """
+    return search_chemicalsafety(cas_nr)[0]
+
+
+def search_chemicalsafety(cas_nr: str) -> Tuple[Optional[Tuple[str, str]], bool]:
+    """Search ChemicalSafety for the SDS of cas_nr, see extract_download_url_from_chemicalsafety
+
+    Parameters
+    ----------
+    cas_nr : str
+        CAS# for chemical of interest
+
+    Returns
+    -------
+    Tuple[Optional[Tuple[str, str]], bool]
+        the (source, url) of the SDS or None, and True if ChemicalSafety couldn't
+        be searched, e.g. it wasn't reachable or answered with a 429 or 5xx
+    """
 
     # global debug
 
-    headers = {
-        'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/88.0.4324.192 Safari/537.36',
-        'accept-encoding': 'gzip, deflate, br',
-        'content-type': 'application/json',
-        # 'Referer': 'https://chemicalsafety.com/sds-search/',
-    }
+    headers = CHEMICALSAFETY_HEADERS
     # get url from chemicalsafety.com to get url to download sds file
     # extract_info_url = 'https://chemicalsafety.com/sds1/retriever.php'
     extract_info_url = 'https://chemicalsafety.com/sds1/sds_retriever.php?action=search'
@@ -510,26 +1052,22 @@ def extract_download_url_from_chemicalsafety(cas_nr: str) -> Optional[Tuple[str,
     #     # "isContains": "0",
     #     # 'searchUrl': "",
     #     }
-    form1 = {
-        "IsContains":"false",
-        "IncludeSynonyms":"false",
-        "SearchSdsServer":"false",
-        "Criteria":[f"cas|{cas_nr}"],
-        "HostName":"sfs website",
-        # "Remote":"97.64.216.42",
-        "Bee":"stevia","Action":"search","SearchUrl":"","ResultColumns":["revision_date"]
-    }
+    # Only the criterion is serialized, the rest of the form is the same for every search
+    form1 = CHEMICALSAFETY_FORM_START + orjson.dumps(f'cas|{cas_nr}') + CHEMICALSAFETY_FORM_END
 
     if debug:
         print('Searching on https://chemicalsafety.com/sds-search/')
 
     try:
-        with requests.Session() as s:
-            r1 = s.post(extract_info_url, headers=headers,
-                           # params={'action': 'search'},
-                data=json.dumps(form1), timeout=20)
-
-            '''Example of r1.json():
+        # A single request that needs no cookies, so it goes through the shared session
+        r1 = SESSION.post(extract_info_url, headers=headers,
+                          # params={'action': 'search'},
+                          data=form1, timeout=SEARCH_TIMEOUT)
+        # An error page isn't JSON, so the answer is only decoded after a 200
+        if r1.status_code != 200:
+            return None, is_failed_response(r1)
+
+        '''Example of r1.json():
 {'cols': [{'name': 'MSDS_ID', 'prompt': 'MSDS_ID'},
           {'name': 'COMMON', 'prompt': 'Product Name'},
           {'name': 'MANUFACT', 'prompt': 'MANUFACTURER'},
@@ -596,59 +1134,58 @@ def extract_download_url_from_chemicalsafety(cas_nr: str) -> Optional[Tuple[str,
            '32508606',
            '2018-07-06',
            'https://www.tcichemicals.com/US/en/sds/T0211_US_EN.pdf']]}
-            '''
-            cols = [row['name'] for row in r1.json()['cols']]
-            cas_col_index = cols.index('CAS')
-            manufacture_col_index = cols.index('MANUFACT')
-            sds_url_col_index = cols.index('HTTPMSDSREF')
-            correct_compounds = [(row[sds_url_col_index], row[manufacture_col_index])
-                        for row in r1.json()['rows']
-                        if (row[cas_col_index] == cas_nr
-                            and re.search(r'^http.+\.pdf$', row[sds_url_col_index]))
-                        ]
-            if correct_compounds:
-                url = correct_compounds[-1][0]
-                manufacture = correct_compounds[-1][1]
-                return manufacture, url
-
-            # # Check to see if give OK status (200) and not redirect
-            # if r1.status_code == 200 and len(r1.history) == 0 and r1.json():
-            #     id_list = r1.json()['rows']
-            #     msds_id = ''
-            #     for item in id_list:
-            #         if item[3] == cas_nr:
-            #             msds_id = item[0]
-            #             break
-            #     if msds_id != '':
-            #         # sds_viewer_url = 'https://chemicalsafety.com/sds1/sdsviewer.php'
-            #         url2 = 'https://chemicalsafety.com/sds1/retriever.php'
-            #         form2 = {"Action": "msdsdetail",
-            #              "P1": msds_id,
-            #              "Bee": "chemsafe",
-            #              }
-            #         r2 = s.post(url2,
-            #                     headers=headers,
-            #             data=json.dumps(form2), timeout=20)
-            #         breakpoint()
-            #         result = r2.json()['rows'][0]
-            #         #Confirm the msds_id and cas_nr:
-            #         if msds_id == result[0] and cas_nr == result[3]:
-            #             sds_pdf_file = result[10].rstrip(',')
-            #             form3 = {"action":"getpdfurl","p1":sds_pdf_file,"p2":"","p3":"", "bee": "chemsafe", "isContains":""}
-            #             r3 = s.post(extract_info_url, headers=headers, data=json.dumps(form3), timeout=20)
-            #             #Get the url
-            #             # Translate curl to python https://curl.trillworks.com/
-            #             # urllib.parse doc: https://docs.python.org/3.6/library/urllib.parse.html
-            #             full_url = r3.json()['url']
-            #             # print(f'{full_url=}'); exit()
-            #             return 'ChemicalSafety', full_url
+        '''
+        response_data = orjson.loads(r1.content)
+        col_indexes = {col['name']: index for index, col in enumerate(response_data.get('cols') or [])}
+        cas_col_index = col_indexes['CAS']
+        manufacture_col_index = col_indexes['MANUFACT']
+        sds_url_col_index = col_indexes['HTTPMSDSREF']
+        # The last matching row is used, so search from the end and stop at the first hit
+        for row in reversed(response_data.get('rows') or []):
+            if row[cas_col_index] == cas_nr and is_pdf_url(row[sds_url_col_index]):
+                return (row[manufacture_col_index], row[sds_url_col_index]), False
+
+        # # Check to see if give OK status (200) and not redirect
+        # if r1.status_code == 200 and len(r1.history) == 0 and r1.json():
+        #     id_list = r1.json()['rows']
+        #     msds_id = ''
+        #     for item in id_list:
+        #         if item[3] == cas_nr:
+        #             msds_id = item[0]
+        #             break
+        #     if msds_id != '':
+        #         # sds_viewer_url = 'https://chemicalsafety.com/sds1/sdsviewer.php'
+        #         url2 = 'https://chemicalsafety.com/sds1/retriever.php'
+        #         form2 = {"Action": "msdsdetail",
+        #              "P1": msds_id,
+        #              "Bee": "chemsafe",
+        #              }
+        #         r2 = s.post(url2,
+        #                     headers=headers,
+        #             data=json.dumps(form2), timeout=20)
+        #         breakpoint()
+        #         result = r2.json()['rows'][0]
+        #         #Confirm the msds_id and cas_nr:
+        #         if msds_id == result[0] and cas_nr == result[3]:
+        #             sds_pdf_file = result[10].rstrip(',')
+        #             form3 = {"action":"getpdfurl","p1":sds_pdf_file,"p2":"","p3":"", "bee": "chemsafe", "isContains":""}
+        #             r3 = s.post(extract_info_url, headers=headers, data=json.dumps(form3), timeout=20)
+        #             #Get the url
+        #             # Translate curl to python https://curl.trillworks.com/
+        #             # urllib.parse doc: https://docs.python.org/3.6/library/urllib.parse.html
+        #             full_url = r3.json()['url']
+        #             # print(f'{full_url=}'); exit()
+        #             return 'ChemicalSafety', full_url
     except Exception as error:
         # print('.', end='')
         if debug:
             # traceback_str = ''.join(traceback.format_exception(etype=type(error), value=error, tb=error.__traceback__))
             # print(traceback_str)
             traceback.print_exception(error)
-        # return None
+        # A network error means the website couldn't be searched
+        return None, isinstance(error, requests.RequestException)
+
+    return None, False
 
 
 def extract_download_url_from_fluorochem(cas_nr: str) -> Optional[Tuple[str, str]]:
@@ -668,23 +1205,32 @@ def extract_download_url_from_fluorochem(cas_nr: str) -> Optional[Tuple[str, str
             the URL from Fluorochem for SDS file
         None: if URL cannot be found
     """
+    return search_fluorochem(cas_nr)[0]
+
+
+def search_fluorochem(cas_nr: str) -> Tuple[Optional[Tuple[str, str]], bool]:
+    """Search Fluorochem for the SDS of cas_nr, see extract_download_url_from_fluorochem
+
+    Parameters
+    ----------
+    cas_nr : str
+        CAS# for chemical of interest
+
+    Returns
+    -------
+    Tuple[Optional[Tuple[str, str]], bool]
+        the (source, url) of the SDS or None, and True if Fluorochem couldn't
+        be searched, e.g. it wasn't reachable or answered with a 429 or 5xx
+    """
     global debug
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Accept-Encoding': 'gzip, deflate',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1'
-    }
+    headers = BROWSER_HEADERS
 
     if debug:
         print('Searching on https://www.fluorochem.co.uk')
 
     try:
-        with requests.Session() as session:
+        with pooled_session() as session:
             # Use the search form found during investigation
             search_urls = [
                 # Main site search form (found in investigation)
@@ -695,66 +1241,61 @@ def extract_download_url_from_fluorochem(cas_nr: str) -> Optional[Tuple[str, str
                 f'https://fluorochem.co.uk/shop/?s={cas_nr}'
             ]
             
+            failed_urls = 0
             for search_url in search_urls:
                 try:
-                    response = session.get(search_url, headers=headers, timeout=15)
+                    response = session.get(search_url, headers=headers, timeout=SEARCH_TIMEOUT)
+                    if is_failed_response(response):
+                        failed_urls += 1
+                        continue
                     
                     if response.status_code == 200:
-                        html = BeautifulSoup(response.text, 'html.parser')
+                        html = BeautifulSoup(response.content, HTML_PARSER)
                         
                         # Look for product results that might contain SDS
-                        product_elements = html.select('div.product, .product-item, .result-item, .search-result')
-                        
-                        if product_elements:
-                            if debug:
+                        if debug:
+                            product_elements = html.select('div.product, .product-item, .result-item, .search-result')
+                            if product_elements:
                                 print(f"  Found {len(product_elements)} product elements")
                         
-                        # Look for direct SDS/MSDS links
-                        sds_selectors = [
-                            'a[href*="sds"]',
-                            'a[href*="msds"]', 
-                            'a[href*="SDS"]',
-                            'a[href*="MSDS"]',
-                            'a:contains("SDS")',
-                            'a:contains("MSDS")',
-                            'a:contains("Safety Data Sheet")',
-                            'a[href$=".pdf"]'  # PDF files might be SDS
-                        ]
-                        
-                        for selector in sds_selectors:
-                            sds_links = html.select(selector)
+                        # Look for direct SDS/MSDS links, links with SDS text and
+                        # PDF links (PDF files might be SDS)
+                        for link in find_sds_links(html):
+                            href = link.get('href', '')
                             
-                            for link in sds_links:
-                                href = link.get('href', '')
-                                text = link.get_text(strip=True).lower()
+                            # Check if this looks like an SDS link
+                            if href and (
+                                SDS_HREF_PATTERN.search(href) or
+                                SDS_TEXT_PATTERN.search(link.get_text(strip=True))
+                            ):
+                                # Make URL absolute if needed
+                                if not href.startswith('http'):
+                                    href = urljoin(response.url, href)
                                 
-                                # Check if this looks like an SDS link
-                                if href and (
-                                    any(term in href.lower() for term in ['sds', 'msds', 'safety']) or
-                                    any(term in text for term in ['sds', 'msds', 'safety data sheet'])
-                                ):
-                                    # Make URL absolute if needed
-                                    if not href.startswith('http'):
-                                        from urllib.parse import urljoin
-                                        href = urljoin(response.url, href)
-                                    
-                                    return 'Fluorochem', href
+                                return ('Fluorochem', href), False
                         
-                        # If no direct SDS links, look for product detail pages to potentially follow
-                        product_links = html.select('a[href*="product"], a[href*="shop"]')
-                        if product_links and debug:
-                            print(f"  Found {len(product_links)} product links - could follow for detailed search")
+                        # If no direct SDS links, look for product detail pages to potentially follow,
+                        # only reported in debug mode
+                        if debug:
+                            product_links = html.select('a[href*="product"], a[href*="shop"]')
+                            if product_links:
+                                print(f"  Found {len(product_links)} product links - could follow for detailed search")
                             
                 except requests.RequestException as e:
+                    failed_urls += 1
                     if debug:
                         print(f"  Error with {search_url}: {e}")
                     continue
+
+            # Only failed if not one search page could be read
+            return None, failed_urls == len(search_urls)
                         
     except Exception as error:
         if debug:
             print(f"Fluorochem search failed: {error}")
+        return None, isinstance(error, requests.RequestException)
     
-    return None
+    return None, False
 
 
 def extract_download_url_from_tci(cas_nr: str) -> Optional[Tuple[str, str]]:
@@ -772,21 +1313,31 @@ def extract_download_url_from_tci(cas_nr: str) -> Optional[Tuple[str, str]]:
         - bool: True if SDS file downloaded or exists
         - str: the name of the SDS source or None
     """
+    return search_tci(cas_nr)[0]
+
+
+def search_tci(cas_nr: str) -> Tuple[Optional[Tuple[str, str]], bool]:
+    """Search TCI for the SDS of cas_nr, see extract_download_url_from_tci
+
+    Parameters
+    ----------
+    cas_nr : str
+        CAS# for chemical of interest
+
+    Returns
+    -------
+    Tuple[Optional[Tuple[str, str]], bool]
+        the (source, url) of the SDS or None, and True if TCI couldn't
+        be searched, e.g. it wasn't reachable or answered with a 429 or 5xx
+    """
     global debug
 
 
     # adv_search_url = 'https://www.tcichemicals.com/US/en/search/?text={}&resulttype=product'.format(cas_nr)
     # adv_search_url = 'https://www.tcichemicals.com/US/en/search/?text={}'.format(cas_nr)
-    adv_search_url = 'https://www.tcichemicals.com/US/en/search/'
-
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
-        'Referer': adv_search_url,
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode':'navigate',
-        'Sec-Fetch-Site':'same-origin',
-        'Sec-Fetch-User':'?1',
-    }
+    adv_search_url = TCI_SEARCH_URL
+
+    headers = TCI_HEADERS
 
     # # Set initial return value for if SDS is downloaded (or existed)
     # downloaded = False
@@ -798,68 +1349,84 @@ def extract_download_url_from_tci(cas_nr: str) -> Optional[Tuple[str, str]]:
         print('Searching on https://www.tcichemicals.com')
 
     try:
-        with requests.Session() as s:
-            # Try multiple approaches with different timeouts
+        with pooled_session() as s:
+            # Try the search formats in order, the next one is only tried if
+            # TCI answered but was too slow or had no results page
             search_approaches = [
                 # Simple GET with CAS in URL
-                (f'{adv_search_url}?text={cas_nr}', 'GET', None, 15),
-                # Original POST approach but with shorter timeout
+                (adv_search_url, 'GET', {'text': cas_nr}, 15),
+                # The same search again with a longer read timeout, for slow responses
                 (adv_search_url, 'GET', {'text': cas_nr}, 25),
                 # Try alternative search format
-                (f'https://www.tcichemicals.com/US/en/search?q={cas_nr}', 'GET', None, 15)
+                (TCI_ALT_SEARCH_URL, 'GET', {'q': cas_nr}, 15)
             ]
             
+            failed_approaches = 0
             for url, method, params, timeout in search_approaches:
                 try:
                     if debug:
                         print(f'  Trying TCI approach: {method} {url}')
                     
                     if method == 'GET':
-                        get_id = s.get(url, headers=headers, timeout=timeout, params=params)
+                        get_id = s.get(url, headers=headers, timeout=(CONNECT_TIMEOUT, timeout), params=params)
                     else:
-                        get_id = s.post(url, headers=headers, timeout=timeout, data=params)
+                        get_id = s.post(url, headers=headers, timeout=(CONNECT_TIMEOUT, timeout), data=params)
                     
-                    if get_id.status_code == 200 and len(get_id.history) == 0:
+                    if is_failed_response(get_id):
+                        failed_approaches += 1
+                    elif get_id.status_code == 200 and len(get_id.history) == 0:
                         break  # Success, continue with processing
                         
+                except requests.exceptions.ConnectionError as e:
+                    # TCI can't be reached, the other formats are on the same website
+                    # (also catches connect timeouts)
+                    if debug:
+                        print(f'  TCI connection error with {method} {url}: {e}')
+                    return None, True
                 except requests.exceptions.Timeout:
+                    failed_approaches += 1
                     if debug:
                         print(f'  TCI timeout with {method} {url}')
                     continue
                 except requests.exceptions.RequestException as e:
+                    failed_approaches += 1
                     if debug:
                         print(f'  TCI request error with {method} {url}: {e}')
                     continue
             else:
-                # All approaches failed
+                # All approaches failed, TCI wasn't searched if none of them answered
                 if debug:
                     print('  All TCI approaches failed')
-                return None
+                return None, failed_approaches == len(search_approaches)
 
             if get_id.status_code == 200 and len(get_id.history) == 0:
-                # get_id.text
-                html = BeautifulSoup(get_id.text, 'html.parser')
-                # print(html.prettify()); exit(1)
+                body = get_id.content
+
+                # Without a result div there is no hit to read, so the page isn't parsed
+                if b'prductlist' not in body:
+                    return None, False
 
                 # Get the token, required for POST request for SDS file name later
-                csrf_token = html.find('input', attrs={'name': 'CSRFToken'})['value'] if html.find('input', attrs={'name': 'CSRFToken'}) else None
+                csrf_token = read_tci_csrf_token(body)
                 # breakpoint()
                 if not csrf_token:
-                    return
+                    return None, False
                 # print(f'{csrf_token=}')
 
-                region_code = html.find_all(string=re.compile(r'(encodedContextPath[^;]+?;)'))
-                # print(region_code[0])
-                encodedContextPath = re.search(r'(encodedContextPath[^;]+?\'(\S+)\';)', region_code[0])[2].replace('\\' ,'')
+                # Set in an inline script, searched in the page source instead of every text node
+                encodedContextPath = ENCODED_CONTEXT_PATH_VALUE_PATTERN.search(body)[2].decode().replace('\\' ,'')
                 # print(encodedContextPath)
 
+                html = BeautifulSoup(body, HTML_PARSER, parse_only=TCI_RESULTS_STRAINER)
+                # print(html.prettify()); exit(1)
+
                 product_cat_css = 'div#contentSearchFacet > span.facet__text:first-child > a:first-child'
                 product_category = html.select(product_cat_css)[0]
                 # print(product_category)
 
                 hit_count = 0
                 if product_category.text == 'Products':
-                    hit_count = re.search(r'\((\d+)\)',
+                    hit_count = HIT_COUNT_PATTERN.search(
                                         html.select(f'{product_cat_css} + span.facet__value__count')[0].text)[1]
                 # print(f'{hit_count=}')
 
@@ -889,13 +1456,19 @@ def extract_download_url_from_tci(cas_nr: str) -> Optional[Tuple[str, str]]:
                                 'selectedCountry': 'US',
                                 'CSRFToken': f'{csrf_token}'
                             }
-                            file_name_res = s.post(sds_url, headers=headers, timeout=15, data=data)
+                            # The response is the SDS itself, only its headers are needed, so
+                            # the body is not downloaded
+                            with s.post(sds_url, headers=headers, timeout=SEARCH_TIMEOUT, data=data,
+                                        stream=True) as file_name_res:
+                                if is_failed_response(file_name_res):
+                                    return None, True
+                                content_disposition = file_name_res.headers.get('content-disposition')
                             # print(f'{file_name_res=}')
                             # print(file_name_res.headers)
-                            # print(f"{file_name_res.headers.get('content-disposition')=}")
+                            # print(f"{content_disposition=}")
 
                             # Get the SDS file name using the return header, in "content-disposition"
-                            res_file = re.search(r'filename=(\S+)$', file_name_res.headers.get('content-disposition'))[1]
+                            res_file = FILENAME_PATTERN.search(content_disposition)[1]
                             # print(f"{res_file=}")
 
                             # url = f'https://www.tcichemicals.com/US/en/sds/{prd_id.upper()}_US_EN.pdf'
@@ -903,7 +1476,7 @@ def extract_download_url_from_tci(cas_nr: str) -> Optional[Tuple[str, str]]:
                             url = f'https://www.tcichemicals.com{encodedContextPath}/sds/{res_file}'
                             # print(url)
 
-                            return 'TCI', url
+                            return ('TCI', url), False
 
     except Exception as error:
         if debug:
@@ -911,6 +1484,9 @@ def extract_download_url_from_tci(cas_nr: str) -> Optional[Tuple[str, str]]:
             # Don't print full traceback for timeouts to reduce noise
             if "timeout" not in str(error).lower():
                 traceback.print_exception(error)
+        return None, isinstance(error, requests.RequestException)
+
+    return None, False
 
 
 if __name__ == '__main__':
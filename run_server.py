@@ -21,7 +21,10 @@ if __name__ == '__main__':
         print("Starting SDS Finder API server...")
         print("API will be available at: http://localhost:5000")
         print("Press Ctrl+C to stop the server")
-        app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
+        # The reloader runs the app in a second process watching for code
+        # changes, so it is only used when asked for with FLASK_RELOAD=1
+        app.run(debug=True, host='0.0.0.0', port=5000, threaded=True,
+                use_reloader=os.environ.get('FLASK_RELOAD') == '1')
     except ImportError as e:
         print(f"Import error: {e}")
         print("Make sure all dependencies are installed: pip install -r requirements.txt")
@@ -0,0 +1,265 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+import app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    '''Flask test client downloading into a temporary directory'''
+    monkeypatch.setattr(app, 'TEMP_DIR', tmp_path)
+    monkeypatch.setattr(app, 'DOWNLOAD_CACHE_DIR', tmp_path / '_shared')
+    (tmp_path / '_shared').mkdir()
+    return app.app.test_client()
+
+
+def wait_for_job(client, status_url, timeout=10):
+    '''Poll the status of a bulk download until it is done'''
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(status_url).get_json()
+        if status['status'] in ('finished', 'failed'):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f'{status_url} did not finish in {timeout} s')
+
+
+def test_bulk_download_queued_and_polled(client, monkeypatch):
+    '''Test a bulk download responds 202 and its status is finished with the results'''
+    def mock_find_sds(cas_list, download_path, pool_size):
+        for cas_nr in cas_list:
+            if cas_nr == '64-19-7':
+                (app.Path(download_path) / f'{cas_nr}-SDS.pdf').write_bytes(b'%PDF-1.4')
+
+    monkeypatch.setattr(app, 'find_sds_by_cas', mock_find_sds)
+
+    response = client.post('/search/cas', json={
+        'cas_numbers': ['64-19-7', '67-68-5', 'not-a-cas'],
+        'download': True,
+    })
+    assert response.status_code == 202
+    queued = response.get_json()
+    assert queued['status'] == 'queued'
+    assert queued['status_url'] == f"/status/{queued['request_id']}"
+
+    status = wait_for_job(client, queued['status_url'])
+    assert status['status'] == 'finished'
+    assert status['total_searched'] == 3
+    assert status['found_count'] == 1
+    assert [r['found'] for r in status['results']] == [True, False, False]
+
+    download = client.get(status['results'][0]['download_url'])
+    assert download.status_code == 200
+    assert download.data == b'%PDF-1.4'
+
+
+def test_bulk_download_failure_reported(client, monkeypatch):
+    '''Test a bulk download that raises is reported as failed'''
+    def mock_find_sds(cas_list, download_path, pool_size):
+        raise RuntimeError('database down')
+
+    monkeypatch.setattr(app, 'find_sds_by_cas', mock_find_sds)
+
+    response = client.post('/search/cas', json={'cas_numbers': ['64-19-7'], 'download': True})
+    status = wait_for_job(client, response.get_json()['status_url'])
+    assert status == {
+        'request_id': response.get_json()['request_id'],
+        'status': 'failed',
+        'error': 'database down',
+    }
+
+
+@pytest.mark.parametrize(
+    'url', [
+        '/status/..',
+        '/status/not-a-request-id',
+        '/status/bbbbbbbbbbbbbbbb',
+        '/download/..%2F..%2Fetc/passwd',
+        '/download/aaaaaaaaaaaaaaaa/..',
+        '/download/aaaaaaaaaaaaaaaa/missing.pdf',
+    ]
+)
+def test_unknown_request_id_not_found(client, url):
+    '''Test ids that aren't request ids and unknown ids are not found'''
+    (app.TEMP_DIR / 'aaaaaaaaaaaaaaaa').mkdir()
+    assert client.get(url).status_code == 404
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    '''Stub databases counting their searches, with empty caches'''
+    calls = []
+
+    def found(query):
+        calls.append(query)
+        return ('ChemBlink', f'https://example.com/{query}.pdf')
+
+    def not_found(query):
+        calls.append(query)
+        return None
+
+    stubs = (('ChemBlink', found), ('VWR', not_found))
+    monkeypatch.setattr(app, 'SOURCES_BY_SEARCH_TYPE', {'cas': stubs, 'product': stubs})
+    monkeypatch.setattr(app, 'SOURCES_CACHE', app.TTLCache(maxsize=16, ttl=app.SEARCH_CACHE_TTL))
+    monkeypatch.setattr(app, 'SOURCES_ERROR_CACHE', app.TTLCache(maxsize=16, ttl=app.SEARCH_ERROR_CACHE_TTL))
+    monkeypatch.setattr(app, 'SEARCH_CACHE', app.TTLCache(maxsize=16, ttl=app.SEARCH_CACHE_TTL))
+    monkeypatch.setattr(app, 'SEARCH_ERROR_CACHE', app.TTLCache(maxsize=16, ttl=app.SEARCH_ERROR_CACHE_TTL))
+    return calls
+
+
+def failing(query):
+    raise app.requests.ConnectionError('connection refused')
+
+
+def test_search_results_cached(client, sources):
+    '''Test a repeated search is answered from the cache, whatever the case and spacing of the name'''
+    first = client.post('/search/product', json={'product_names': ['Acetic  acid']}).get_json()
+    second = client.post('/search/product', json={'product_names': ['acetic acid']}).get_json()
+
+    assert len(sources) == 2
+    assert first['results'][0]['primary_url'] == 'https://example.com/Acetic  acid.pdf'
+    assert second['results'][0]['all_sources'] == first['results'][0]['all_sources']
+    assert list(app.SOURCES_CACHE) == [('product', 'acetic acid')]
+
+
+def test_search_results_with_error_cached_shorter(sources, monkeypatch):
+    '''Test results with a failed database go in the short-lived error cache'''
+    monkeypatch.setattr(app, 'SOURCES_BY_SEARCH_TYPE', {'cas': (('ChemBlink', failing),)})
+
+    results = app.search_sds_sources_all('64-19-7')
+    assert results[0]['status'] == 'error'
+    assert ('cas', '64-19-7') in app.SOURCES_ERROR_CACHE
+    assert ('cas', '64-19-7') not in app.SOURCES_CACHE
+
+
+def test_concurrent_searches_share_one_search(sources, monkeypatch):
+    '''Test a search arriving while the same search runs waits for it instead of searching again'''
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow(query):
+        calls.append(query)
+        started.set()
+        release.wait(5)
+        return ('ChemBlink', 'https://example.com/sds.pdf')
+
+    monkeypatch.setattr(app, 'SOURCES_BY_SEARCH_TYPE', {'cas': (('ChemBlink', slow),)})
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(app.search_sds_sources_all, '64-19-7')
+        assert started.wait(5)
+        second = executor.submit(app.search_sds_sources_all, '64-19-7')
+        time.sleep(0.1)
+        release.set()
+        assert first.result() == second.result()
+
+    assert calls == ['64-19-7']
+    assert app.SOURCES_IN_FLIGHT == {}
+
+
+def test_legacy_search_not_found_with_error_cached_shorter(sources, monkeypatch):
+    '''Test search_sds_sources caches nothing found with a failed database in the error cache'''
+    monkeypatch.setattr(app, 'SOURCES_BY_SEARCH_TYPE', {'cas': (('ChemBlink', failing),)})
+
+    assert app.search_sds_sources('64-19-7') is None
+    assert app.SEARCH_ERROR_CACHE[('64-19-7', 'cas')] is None
+    assert ('64-19-7', 'cas') not in app.SEARCH_CACHE
+
+
+def test_download_cache_shared(client, monkeypatch):
+    '''Test a URL is fetched once and linked to every request asking for it'''
+    fetched = []
+
+    def mock_fetch_file(url, file_path):
+        fetched.append(url)
+        file_path.write_bytes(b'%PDF-1.4')
+        return True
+
+    monkeypatch.setattr(app, 'fetch_file', mock_fetch_file)
+    first = app.TEMP_DIR / 'first.pdf'
+    second = app.TEMP_DIR / 'second.pdf'
+
+    assert app.download_sds_file('https://example.com/sds.pdf', first)
+    assert app.download_sds_file('https://example.com/sds.pdf', second)
+    assert fetched == ['https://example.com/sds.pdf']
+    assert first.stat().st_ino == second.stat().st_ino
+    assert [f.suffix for f in app.DOWNLOAD_CACHE_DIR.iterdir()] == ['.pdf']
+
+
+def test_download_cache_skips_failed_download(client, monkeypatch):
+    '''Test a failed download leaves nothing in the download cache'''
+    def mock_fetch_file(url, file_path):
+        file_path.write_bytes(b'<html>')
+        return False
+
+    monkeypatch.setattr(app, 'fetch_file', mock_fetch_file)
+
+    assert not app.download_sds_file('https://example.com/sds.pdf', app.TEMP_DIR / 'sds.pdf')
+    assert list(app.DOWNLOAD_CACHE_DIR.iterdir()) == []
+
+
+def make_request_dir(name, age, size=0, status=None):
+    '''Request directory with a file of size bytes, last modified age seconds ago'''
+    request_dir = app.TEMP_DIR / name
+    request_dir.mkdir()
+    (request_dir / 'sds.pdf').write_bytes(b'x' * size)
+    if status:
+        app.write_job_status(name, status)
+    mtime = time.time() - age
+    os.utime(request_dir, (mtime, mtime))
+    return request_dir
+
+
+def test_sweep_temp_dir_deletes_expired(client):
+    '''Test expired request directories and shared downloads are deleted, others and active jobs are kept'''
+    expired = make_request_dir('expired', age=app.TEMP_DIR_TTL + 60)
+    recent = make_request_dir('recent', age=60)
+    running = make_request_dir('running', age=app.TEMP_DIR_TTL + 60, status='running')
+    finished = make_request_dir('finished', age=app.TEMP_DIR_TTL + 60, status='finished')
+    shared = app.DOWNLOAD_CACHE_DIR / 'expired.pdf'
+    shared.write_bytes(b'%PDF-1.4')
+    mtime = time.time() - app.TEMP_DIR_TTL - 60
+    os.utime(shared, (mtime, mtime))
+
+    app.sweep_temp_dir()
+
+    assert not expired.exists()
+    assert not finished.exists()
+    assert not shared.exists()
+    assert recent.exists()
+    assert running.exists()
+    assert app.DOWNLOAD_CACHE_DIR.exists()
+
+
+def test_sweep_temp_dir_deletes_oldest_over_size(client, monkeypatch):
+    '''Test the oldest request directories are deleted until TEMP_DIR_MAX_SIZE is respected'''
+    monkeypatch.setattr(app, 'TEMP_DIR_MAX_SIZE', 250)
+    oldest = make_request_dir('oldest', age=300, size=100)
+    older = make_request_dir('older', age=200, size=100)
+    newest = make_request_dir('newest', age=100, size=100)
+    queued = make_request_dir('queued', age=400, size=100, status='queued')
+
+    app.sweep_temp_dir()
+
+    assert not oldest.exists()
+    assert older.exists()
+    assert newest.exists()
+    assert queued.exists()
+
+
+def test_bulk_download_directory_vanished(client, monkeypatch):
+    '''Test a bulk download whose directory was deleted still finishes'''
+    def mock_find_sds(cas_list, download_path, pool_size):
+        shutil.rmtree(download_path)
+
+    monkeypatch.setattr(app, 'find_sds_by_cas', mock_find_sds)
+
+    app.run_bulk_cas_download('aaaaaaaaaaaaaaaa', ['64-19-7'])
+    status = client.get('/status/aaaaaaaaaaaaaaaa').get_json()
+    assert status['status'] == 'finished'
+    assert status['found_count'] == 0
@@ -4,7 +4,7 @@ sys.path.append(os.path.realpath('find_sds'))
 import re
 import pytest
 from unittest.mock import patch
-from find_sds.find_sds import download_sds
+from find_sds.find_sds import download_sds, download_sds_with_status
 
 
 def mock_raise_exception():
@@ -68,7 +68,25 @@ def test_download_sds_with_error(tmpdir, monkeypatch, cas_nr, expect):
     monkeypatch.setattr("find_sds.find_sds.debug", True)
 
     # monkeypatch.setattr('find_sds.find_sds.extract_download_url_from_fisher', mock_raise_exception)
-    monkeypatch.setattr('find_sds.find_sds.extract_download_url_from_chemblink', mock_raise_exception)
+    monkeypatch.setattr('find_sds.find_sds.search_chemblink', mock_raise_exception)
+    # An SDS found by an earlier test would be downloaded without searching
+    monkeypatch.setattr('find_sds.find_sds.DOWNLOAD_URL_CACHE', {})
 
     result = download_sds(cas_nr, download_path=tmpdir)
     assert result == expect
+
+
+@pytest.mark.parametrize(
+    "website_failed, expect", [
+        (False, ('623-51-8', False, None, True)),
+        (True, ('623-51-8', False, None, False)),
+    ]
+)
+def test_download_sds_with_status(tmpdir, monkeypatch, website_failed, expect):
+    '''Test download_sds_with_status() only reports the SDS as not found when every website was searched'''
+    monkeypatch.setattr('find_sds.find_sds.DOWNLOAD_URL_CACHE', {})
+    for name in ('chemblink', 'vwr', 'fisher', 'chemicalsafety', 'fluorochem'):
+        monkeypatch.setattr('find_sds.find_sds.search_' + name, lambda cas_nr: (None, False))
+    monkeypatch.setattr('find_sds.find_sds.search_tci', lambda cas_nr: (None, website_failed))
+
+    assert download_sds_with_status('623-51-8', download_path=tmpdir) == expect
@@ -0,0 +1,128 @@
+import sys, os
+sys.path.append(os.path.realpath('find_sds'))
+
+import time
+import orjson
+import pytest
+from find_sds import enhanced_search
+from find_sds.enhanced_search import cache_by_name, lookup_many, search_all_vendors
+
+
+def slow_search(result, delay=0.2):
+    def search(product_name):
+        time.sleep(delay)
+        return result
+    return search
+
+
+@pytest.mark.parametrize(
+    "extractors, expect", [
+        ((slow_search(None), slow_search(('VWR', 'url1')), slow_search(('TCI', 'url2'))), ('VWR', 'url1')),
+        ((slow_search(None), slow_search(None)), None),
+    ]
+)
+def test_search_all_vendors(monkeypatch, extractors, expect):
+    '''Test search_all_vendors() returns the preferred result with the vendors searched concurrently'''
+    monkeypatch.setattr('find_sds.enhanced_search.PRODUCT_NAME_EXTRACTORS', extractors)
+
+    start = time.monotonic()
+    assert search_all_vendors('acetone') == expect
+    assert time.monotonic() - start < 0.2 * len(extractors)
+
+
+def test_cache_by_name():
+    '''Test cache_by_name() only searches again for names without a found SDS'''
+    searched = []
+
+    @cache_by_name
+    def search(product_name):
+        searched.append(product_name)
+        return ('VWR', 'url') if 'acetone' in product_name.lower() else None
+
+    assert search('Acetone') == ('VWR', 'url')
+    assert search('  ACETONE ') == ('VWR', 'url')
+    assert search('water') is None
+    assert search('water') is None
+    assert searched == ['Acetone', 'water', 'water']
+
+
+def test_lookup_many():
+    '''Test lookup_many() returns the preferred result for every name with all searches run concurrently'''
+    def search_vwr(product_name):
+        time.sleep(0.2)
+        return ('VWR', f'{product_name}-vwr') if product_name == 'acetone' else None
+
+    def search_tci(product_name):
+        time.sleep(0.2)
+        return ('TCI', f'{product_name}-tci') if product_name != 'water' else None
+
+    start = time.monotonic()
+    results = lookup_many(['acetone', 'ethanol', 'water', 'acetone'], extractors=(search_vwr, search_tci))
+    assert time.monotonic() - start < 0.4
+
+    assert results == {
+        'acetone': ('VWR', 'acetone-vwr'),
+        'ethanol': ('TCI', 'ethanol-tci'),
+        'water': None,
+    }
+
+
+def test_fluorochem_by_name_skips_unnamed_molecules(monkeypatch):
+    '''Test a Fluorochem result without a molecule name doesn't match every search'''
+    class Response:
+        status_code = 200
+        history = []
+        content = orjson.dumps({'data': [
+            {'molecule': {'name': None, 'sds': {'custrecord_sdslink_en': '/unnamed.pdf'}}},
+            {'molecule': {'name': 'Acetone', 'sds': {'custrecord_sdslink_en': '/acetone.pdf'}}},
+        ]})
+
+    monkeypatch.setattr(enhanced_search.SESSION, 'post', lambda *args, **kwargs: Response())
+
+    assert enhanced_search.extract_download_url_from_fluorochem_by_name.__wrapped__('acetone') == \
+        ('Fluorochem', 'https://7128445.app.netsuite.com/acetone.pdf')
+
+
+class StreamedResponse:
+    '''Response streamed in small chunks'''
+    encoding = 'utf-8'
+
+    def __init__(self, html):
+        self.content = html.encode()
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), 7):
+            yield self.content[i:i + 7]
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("lxml", [True, False])
+@pytest.mark.parametrize(
+    "html, expect", [
+        # Nested elements with the same tag and class as the container come before the link
+        ('<a href="/before">x</a><div class="catlog_items"><div><p>name</p></div>'
+         '<div class="catlog_items"><span>no link</span></div><td>x</td>'
+         '<a href="/sds/1">SDS</a></div><a href="/after">x</a>', '/sds/1'),
+        # Only the first element with the class is searched
+        ('<ul><li class="catlog_items"><div><span>no link</span></div></li>'
+         '<li class="catlog_items"><a href="/sds/2">SDS</a></li></ul>', None),
+        ('<table><tr><td class="other catlog_items"><table><tr><td>x</td></tr></table>'
+         '<a>no href</a><a href="/sds/3">SDS</a></td></tr></table>', None),
+        # The end tag of the element is implied by the next one
+        ('<ul><li class="catlog_items"><span>no link</span><li><a href="/sds/4">SDS</a></ul>', None),
+        ('<p>no results</p>', None),
+    ]
+)
+def test_find_first_link_in_class(monkeypatch, lxml, html, expect):
+    '''Test _find_first_link_in_class() finds the first link of the first element with the class'''
+    if not lxml:
+        monkeypatch.setattr('find_sds.enhanced_search.HTMLPullParser', None)
+    elif enhanced_search.HTMLPullParser is None:
+        pytest.skip('lxml is not installed')
+
+    response = StreamedResponse(html)
+    assert enhanced_search._find_first_link_in_class(response, 'catlog_items') == expect
+    assert response.closed
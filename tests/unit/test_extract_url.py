@@ -3,6 +3,9 @@ sys.path.append(os.path.realpath('find_sds'))
 
 import re
 import pytest
+import requests
+from find_sds.find_sds import search_chemblink, search_vwr, search_fisher, \
+                              search_chemicalsafety, search_fluorochem, search_tci
 from find_sds.find_sds import extract_download_url_from_fisher, \
                                     extract_download_url_from_chemicalsafety, \
                                     extract_download_url_from_fluorochem, \
@@ -51,7 +54,7 @@ def test_extract_url_from_fisher(cas_nr, expect):
     ]
 )
 def test_extract_url_from_fisher_with_exception(monkeypatch, cas_nr, expect):
-    monkeypatch.setattr('find_sds.find_sds.requests.get', mock_raise_exception)
+    monkeypatch.setattr('find_sds.find_sds.SESSION.get', mock_raise_exception)
     result = extract_download_url_from_fisher(cas_nr)
     assert result == expect
 
@@ -101,7 +104,7 @@ def test_extract_url_from_chemicalsafety(cas_nr, expect):
     ]
 )
 def test_extract_url_from_chemicalsafety_with_exception(monkeypatch, cas_nr, expect):
-    monkeypatch.setattr('find_sds.find_sds.requests.post', mock_raise_exception)
+    monkeypatch.setattr('find_sds.find_sds.SESSION.post', mock_raise_exception)
     result = extract_download_url_from_chemicalsafety(cas_nr)
     assert result == expect
 
@@ -146,7 +149,7 @@ def test_extract_url_from_fluorochem(cas_nr, expect):
     ]
 )
 def test_extract_url_from_fluorochem_with_exception(monkeypatch, cas_nr, expect):
-    monkeypatch.setattr('find_sds.find_sds.requests.post', mock_raise_exception)
+    monkeypatch.setattr('find_sds.find_sds.requests.Session', mock_raise_exception)
     result = extract_download_url_from_fluorochem(cas_nr)
     assert result == expect
 
@@ -195,7 +198,7 @@ def test_extract_url_from_chemblink(cas_nr, expect):
     ]
 )
 def test_extract_url_from_chemblink_with_exception(monkeypatch, cas_nr, expect):
-    monkeypatch.setattr('find_sds.find_sds.requests.get', mock_raise_exception)
+    monkeypatch.setattr('find_sds.find_sds.SESSION.get', mock_raise_exception)
     result = extract_download_url_from_chemblink(cas_nr)
     assert result == expect
 
@@ -321,3 +324,68 @@ def test_extract_url_from_tci_with_exception(monkeypatch, cas_nr, expect):
     monkeypatch.setattr('find_sds.find_sds.requests.Session', mock_raise_exception)
     result = extract_download_url_from_tci(cas_nr)
     assert result == expect
+
+
+def mock_response(status_code, content=b'<html></html>'):
+    def respond(*args, **kwargs):
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = content
+        response.url = 'https://example.com/'
+        return response
+    return respond
+
+
+@pytest.mark.parametrize(
+    "search", [
+        search_chemblink,
+        search_vwr,
+        search_fisher,
+        search_chemicalsafety,
+        search_fluorochem,
+        search_tci,
+    ]
+)
+@pytest.mark.parametrize(
+    "status_code, expect", [
+        (404, (None, False)),
+        (429, (None, True)),
+        (503, (None, True)),
+    ]
+)
+def test_search_with_error_response(monkeypatch, search, status_code, expect):
+    '''Test the searches report rate limits and server errors as failed searches, not as SDS not found'''
+    # The shared session and the sessions made for each search
+    for target in ('find_sds.find_sds.SESSION', 'requests.Session'):
+        monkeypatch.setattr(target + '.get', mock_response(status_code))
+        monkeypatch.setattr(target + '.post', mock_response(status_code))
+
+    assert search('623-51-8') == expect
+
+
+def test_search_with_connection_error(monkeypatch):
+    '''Test a website that can't be reached is reported as a failed search'''
+    def mock_connection_error(*args, **kwargs):
+        raise requests.ConnectionError()
+
+    monkeypatch.setattr('find_sds.find_sds.SESSION.get', mock_connection_error)
+
+    assert search_chemblink('623-51-8') == (None, True)
+
+
+def test_search_tci_retries_slow_response(monkeypatch):
+    '''Test a TCI search that times out is tried again with a longer read timeout'''
+    read_timeouts = []
+    respond = mock_response(200, b'<html>no results</html>')
+
+    def mock_get(*args, timeout, **kwargs):
+        read_timeouts.append(timeout[1])
+        if len(read_timeouts) == 1:
+            raise requests.ReadTimeout()
+        return respond()
+
+    monkeypatch.setattr('find_sds.find_sds.SESSION.get', mock_get)
+    monkeypatch.setattr('requests.Session.get', mock_get)
+
+    assert search_tci('623-51-8') == (None, False)
+    assert read_timeouts == [15, 25]
@@ -0,0 +1,39 @@
+import sys, os
+sys.path.append(os.path.realpath('find_sds'))
+
+import pytest
+from find_sds.find_sds import find_download_url
+
+SEARCHES = (
+    'search_chemblink',
+    'search_vwr',
+    'search_fisher',
+    'search_tci',
+    'search_chemicalsafety',
+    'search_fluorochem',
+)
+
+
+@pytest.mark.parametrize(
+    "found, failed, expect, expect_searches", [
+        (('VWR', 'url1'), False, (('VWR', 'url1'), False), 1),
+        (None, False, (None, False), 2),
+        (None, True, (None, True), 2),
+    ]
+)
+def test_find_download_url(monkeypatch, found, failed, expect, expect_searches):
+    '''Test find_download_url() only searches again for CAS numbers without an SDS found'''
+    searches = []
+
+    def mock_search(cas_nr):
+        searches.append(cas_nr)
+        return found, failed
+
+    monkeypatch.setattr('find_sds.find_sds.DOWNLOAD_URL_CACHE', {})
+    monkeypatch.setattr('find_sds.find_sds.search_chemblink', mock_search)
+    for name in SEARCHES[1:]:
+        monkeypatch.setattr('find_sds.find_sds.' + name, lambda cas_nr: (None, False))
+
+    assert find_download_url('623-51-8') == expect
+    assert find_download_url('623-51-8') == expect
+    assert len(searches) == expect_searches
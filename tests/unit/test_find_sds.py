@@ -5,7 +5,7 @@ import re
 from pathlib import Path
 import pytest
 from unittest.mock import patch
-from find_sds.find_sds import find_sds
+from find_sds.find_sds import find_sds, load_missing_sds_cache
 
 
 # def mock_raise_exception():
@@ -45,3 +45,28 @@ def test_find_sds(tmpdir, monkeypatch):
     for cas in cas_list:
         file = Path(tmpdir) / (cas + '-SDS.pdf')
         assert file.exists()
+
+
+def test_find_sds_skips_duplicate_and_invalid_cas(tmpdir, monkeypatch):
+    '''Test find_sds() searches each valid CAS number once, whatever its spacing'''
+    searched = []
+
+    def mock_download_sds(cas_nr, download_path):
+        searched.append(cas_nr)
+        return cas_nr, False, None, True
+
+    monkeypatch.setattr('find_sds.find_sds.download_sds_with_status', mock_download_sds)
+
+    find_sds(['67-63-0', ' 67-63-0 ', '67-63-1', 'not a cas', None, '', '75-09-2'], download_path=tmpdir)
+    assert sorted(searched) == ['67-63-0', '75-09-2']
+
+
+def test_find_sds_only_caches_sds_not_found(tmpdir, monkeypatch):
+    '''Test find_sds() doesn't remember CAS numbers whose search or download failed as missing'''
+    def mock_download_sds(cas_nr, download_path):
+        return cas_nr, False, None, cas_nr == '67-63-0'
+
+    monkeypatch.setattr('find_sds.find_sds.download_sds_with_status', mock_download_sds)
+
+    find_sds(['67-63-0', '75-09-2'], download_path=tmpdir)
+    assert list(load_missing_sds_cache(tmpdir)) == ['67-63-0']
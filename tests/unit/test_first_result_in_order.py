@@ -0,0 +1,46 @@
+import sys, os
+sys.path.append(os.path.realpath('find_sds'))
+
+import time
+import pytest
+from find_sds.find_sds import first_result_in_order
+
+
+def slow_extractor(result, delay):
+    def extract(cas_nr):
+        time.sleep(delay)
+        return result
+    return extract
+
+
+def mock_raise_exception(cas_nr):
+    raise RuntimeError()
+
+
+@pytest.mark.parametrize(
+    "extractors, expect", [
+        ((slow_extractor(None, 0.2), slow_extractor(('VWR', 'url1'), 0.1), slow_extractor(('TCI', 'url2'), 0)), ('VWR', 'url1')),
+        ((slow_extractor(('ChemBlink', 'url0'), 0.2), slow_extractor(('VWR', 'url1'), 0)), ('ChemBlink', 'url0')),
+        ((slow_extractor(None, 0.1), slow_extractor(None, 0.2)), None),
+    ]
+)
+def test_first_result_in_order(extractors, expect):
+    '''Test first_result_in_order() keeps the order of preference with the extractors run concurrently'''
+    start = time.monotonic()
+    assert first_result_in_order(extractors, '623-51-8') == expect
+    assert time.monotonic() - start < 0.3
+
+
+def test_first_result_in_order_returns_early():
+    '''Test first_result_in_order() doesn't wait for extractors after the result'''
+    extractors = (slow_extractor(('ChemBlink', 'url0'), 0), slow_extractor(None, 1))
+
+    start = time.monotonic()
+    assert first_result_in_order(extractors, '623-51-8') == ('ChemBlink', 'url0')
+    assert time.monotonic() - start < 0.5
+
+
+def test_first_result_in_order_with_exception():
+    '''Test first_result_in_order() raises the error of an extractor before the result, like an `or` chain'''
+    with pytest.raises(RuntimeError):
+        first_result_in_order((mock_raise_exception, slow_extractor(('VWR', 'url1'), 0)), '623-51-8')
@@ -0,0 +1,26 @@
+import sys, os
+sys.path.append(os.path.realpath('find_sds'))
+
+import pytest
+from find_sds.find_sds import is_valid_cas
+
+
+@pytest.mark.parametrize(
+    "cas_nr, expect", [
+        ('67-63-0', True),
+        ('7732-18-5', True),
+        ('681128-50-7', True),
+        ('00000-00-0', True),
+        ('67-63-1', False),
+        ('67-63', False),
+        ('6763-0', False),
+        ('1-63-0', False),
+        ('12345678-63-0', False),
+        (' 67-63-0', False),
+        ('acetone', False),
+        ('', False),
+    ]
+)
+def test_is_valid_cas(cas_nr, expect):
+    '''Test is_valid_cas() with valid, mistyped and malformed CAS numbers'''
+    assert is_valid_cas(cas_nr) == expect
@@ -0,0 +1,32 @@
+import sys, os
+sys.path.append(os.path.realpath('find_sds'))
+
+import time
+from pathlib import Path
+import pytest
+from find_sds.find_sds import MISSING_SDS_CACHE_FILE, MISSING_SDS_CACHE_TTL, \
+                              load_missing_sds_cache, save_missing_sds_cache
+
+
+def test_missing_sds_cache(tmpdir):
+    '''Test the cache of CAS numbers without SDS drops searches older than MISSING_SDS_CACHE_TTL'''
+    now = time.time()
+    save_missing_sds_cache(tmpdir, {'00000-00-0': now, '681128-50-7': now - MISSING_SDS_CACHE_TTL - 1})
+
+    assert load_missing_sds_cache(tmpdir) == {'00000-00-0': now}
+
+
+@pytest.mark.parametrize(
+    "content", [
+        None,
+        b'',
+        b'not json',
+        b'["00000-00-0"]',
+    ]
+)
+def test_missing_sds_cache_unreadable(tmpdir, content):
+    '''Test a missing or broken cache file is read as an empty cache'''
+    if content is not None:
+        (Path(tmpdir) / MISSING_SDS_CACHE_FILE).write_bytes(content)
+
+    assert load_missing_sds_cache(tmpdir) == {}
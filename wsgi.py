@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production servers such as gunicorn
+
+    gunicorn -k gthread -w 4 --threads 32 --timeout 120 -b 0.0.0.0:5000 wsgi:app
+"""
+
+from app import app
+
+application = app